@@ -1,5 +1,6 @@
 """Widgets to work with AiiDA nodes."""
 
+import collections
 import functools
 
 import ipytree
@@ -22,10 +23,17 @@ class AiidaNodeTreeNode(ipytree.Node):
 
 
 class AiidaProcessNodeTreeNode(AiidaNodeTreeNode):
-    def __init__(self, pk, **kwargs):
+    def __init__(self, pk, mtime=None, **kwargs):
         self.outputs_node = AiidaOutputsTreeNode(name="outputs", parent_pk=pk)
+        # Modification time of the process node when the tree node was last updated.
+        self.mtime = mtime
         super().__init__(pk=pk, **kwargs)
 
+    @property
+    def is_built(self):
+        """Whether the children of the node have been found."""
+        return self.outputs_node in self.nodes
+
 
 class WorkChainProcessTreeNode(AiidaProcessNodeTreeNode):
     icon = tl.Unicode("chain").tag(sync=True)
@@ -54,12 +62,35 @@ class UnknownTypeTreeNode(AiidaNodeTreeNode):
     icon = tl.Unicode("file").tag(sync=True)
 
 
+class AiidaPlaceholderTreeNode(ipytree.Node):
+    """Stands for the children of a collapsed process node that are not loaded yet."""
+
+    icon = tl.Unicode("ellipsis-h").tag(sync=True)
+
+    def __init__(self, parent_pk, num_called=0, **kwargs):
+        self.parent_pk = parent_pk
+        super().__init__(name=self._format_name(num_called), **kwargs)
+
+    @staticmethod
+    def _format_name(num_called):
+        return f"{num_called} called process{'' if num_called == 1 else 'es'}"
+
+    def set_num_called(self, num_called):
+        name = self._format_name(num_called)
+        if self.name != name:
+            self.name = name
+
+
 class NodesTreeWidget(ipw.Output):
     """A tree widget for the structured representation of a nodes graph."""
 
     nodes = tl.Tuple().tag(trait=tl.Instance(orm.Node))
     selected_nodes = tl.Tuple(read_only=True).tag(trait=tl.Instance(orm.Node))
 
+    # In lazy mode, the called processes are collapsed and their children are
+    # only found once they are expanded.
+    lazy = tl.Bool(False)
+
     PROCESS_STATE_STYLE = {
         engine.ProcessState.EXCEPTED: "danger",
         engine.ProcessState.FINISHED: "success",
@@ -78,6 +109,8 @@ class NodesTreeWidget(ipw.Output):
 
     def __init__(self, **kwargs):
         self._tree = ipytree.Tree()
+        # Tree nodes in the tree, indexed by their (pk, namespaces).
+        self._index = collections.defaultdict(list)
         self._tree.observe(self._observe_tree_selected_nodes, ["selected_nodes"])
 
         super().__init__(**kwargs)
@@ -95,11 +128,15 @@ class NodesTreeWidget(ipw.Output):
             # find the selected node and build the tree from it, so that users can expand and explore the tree
             node_pk = (
                 node.parent_pk
-                if isinstance(node, AiidaOutputsTreeNode)
+                if isinstance(node, (AiidaOutputsTreeNode, AiidaPlaceholderTreeNode))
                 else getattr(node, "pk", None)
             )
 
-            self._build_tree(self.find_node(node_pk, getattr(node, "namespaces", None)))
+            tree_node = self._build_tree(
+                self.find_node(node_pk, getattr(node, "namespaces", None))
+            )
+            if isinstance(node, AiidaPlaceholderTreeNode):
+                tree_node.opened = True
         return self.set_trait(
             "selected_nodes",
             tuple(
@@ -122,13 +159,14 @@ class NodesTreeWidget(ipw.Output):
 
     @tl.observe("nodes")
     def _observe_nodes(self, change):
-        self._tree.nodes = tuple(
+        self._set_children(
+            self._tree,
             sorted(
                 self._convert_to_tree_nodes(
                     old_nodes=self._tree.nodes, new_nodes=change["new"]
                 ),
                 key=lambda node: node.pk,
-            )
+            ),
         )
         self.update()
         self._refresh_output()
@@ -141,20 +179,31 @@ class NodesTreeWidget(ipw.Output):
                 name = calc_info(node)
             else:
                 name = str(node)
+        if isinstance(node, orm.ProcessNode):
+            kwargs["mtime"] = node.mtime
         tree_node = cls.NODE_TYPE.get(type(node), UnknownTypeTreeNode)(
             pk=node.pk, name=name, **kwargs
         )
         # Set the style based on the process state of the node
         if isinstance(node, orm.ProcessNode):
-            process_state = (
-                engine.ProcessState.EXCEPTED if node.is_failed else node.process_state
-            )
-            tree_node.icon_style = cls.PROCESS_STATE_STYLE.get(
-                process_state, cls.PROCESS_STATE_STYLE_DEFAULT
+            tree_node.icon_style = cls._process_state_style(
+                node.process_state, node.exit_status
             )
 
         return tree_node
 
+    @classmethod
+    def _process_state_style(cls, process_state, exit_status):
+        """Return the icon style for the process state and exit status."""
+        if process_state is not None:
+            process_state = engine.ProcessState(process_state)
+        # Override the process state in case that the process node has failed.
+        if process_state is engine.ProcessState.FINISHED and exit_status != 0:
+            process_state = engine.ProcessState.EXCEPTED
+        return cls.PROCESS_STATE_STYLE.get(
+            process_state, cls.PROCESS_STATE_STYLE_DEFAULT
+        )
+
     @classmethod
     def _find_called(cls, root):
         assert isinstance(root, AiidaProcessNodeTreeNode)
@@ -220,53 +269,196 @@ class NodesTreeWidget(ipw.Output):
         elif isinstance(root, AiidaOutputsTreeNode):
             yield from cls._find_outputs(root)
 
-    @classmethod
-    def _build_tree(cls, root):
+    def _build_tree(self, root):
         """Build a tree nodes graph for a given tree node."""
-        root.nodes = list(cls._find_children(root))
+        self._set_children(root, self._find_children(root))
+        if self.lazy:
+            self._collapse(
+                [
+                    node
+                    for node in root.nodes
+                    if isinstance(node, AiidaProcessNodeTreeNode) and not node.nodes
+                ]
+            )
         return root
 
-    @classmethod
-    def _walk_tree(cls, root):
-        """Breadth-first search of the node tree."""
-        yield root
-        for node in root.nodes:
-            yield from cls._walk_tree(node)
-
-    def _update_tree_node(self, tree_node):
-        if isinstance(tree_node, AiidaProcessNodeTreeNode):
-            process_node = orm.load_node(tree_node.pk)
-            assert isinstance(process_node, orm.ProcessNode)
-            if process_node.process_state is None:
-                return
+    def _collapse(self, tree_nodes):
+        """Collapse the process tree nodes, their children are found when expanded."""
+        num_called = self._query_num_called([tree_node.pk for tree_node in tree_nodes])
+        for tree_node in tree_nodes:
+            with tree_node.hold_sync():
+                tree_node.opened = False
+                self._set_children(
+                    tree_node,
+                    [
+                        AiidaPlaceholderTreeNode(
+                            parent_pk=tree_node.pk,
+                            num_called=num_called[tree_node.pk],
+                        )
+                    ],
+                )
+            tree_node.observe(self._observe_tree_node_opened, ["opened"])
+
+    def _observe_tree_node_opened(self, change):
+        if change["new"] and not change["owner"].is_built:
+            self._build_tree(change["owner"])
+
+    @staticmethod
+    def _query_num_called(pks):
+        """Count the processes called by each of the given processes."""
+        if not pks:
+            return collections.Counter()
+        queryb = orm.QueryBuilder()
+        queryb.append(
+            orm.ProcessNode, filters={"id": {"in": list(pks)}}, project=["id"], tag="p"
+        )
+        queryb.append(orm.ProcessNode, with_incoming="p")
+        # The QueryBuilder does not support GROUP BY, the counting is done here.
+        return collections.Counter(pk for (pk,) in queryb.iterall())
+
+    @staticmethod
+    def _walk_tree(root):
+        """Depth-first (pre-order) walk of the node tree.
+
+        The walk is iterative, so that deeply nested workflows do not hit the
+        recursion limit.
+        """
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.nodes))
+
+    def _update_tree_node(self, tree_node, state):
+        if state["process_state"] is None:
+            return
+        process_node = orm.load_node(tree_node.pk)
+        assert isinstance(process_node, orm.ProcessNode)
+        with tree_node.hold_sync():
             tree_node.name = calc_info(process_node)
-            # Override the process state in case that the process node has failed:
-            # (This could be refactored with structural pattern matching with py>=3.10.)
-            process_state = (
-                engine.ProcessState.EXCEPTED
-                if process_node.is_failed
-                else process_node.process_state
+            tree_node.icon_style = self._process_state_style(
+                state["process_state"], state["exit_status"]
             )
-            tree_node.icon_style = self.PROCESS_STATE_STYLE.get(
-                process_state, self.PROCESS_STATE_STYLE_DEFAULT
+        tree_node.mtime = state["mtime"]
+
+    @staticmethod
+    def _query_process_states(pks):
+        """Fetch the state and called processes of the given process nodes.
+
+        Everything is fetched with a single query, the called processes are
+        joined with an outer join so that processes without any are included.
+        """
+        queryb = orm.QueryBuilder()
+        queryb.append(
+            orm.ProcessNode,
+            filters={"id": {"in": list(pks)}},
+            project=[
+                "id",
+                "attributes.process_state",
+                "attributes.exit_status",
+                "mtime",
+            ],
+            tag="process",
+        )
+        queryb.append(
+            orm.ProcessNode, with_incoming="process", project=["id"], outerjoin=True
+        )
+        states = {}
+        for pk, process_state, exit_status, mtime, called_pk in queryb.iterall():
+            state = states.setdefault(
+                pk,
+                {
+                    "process_state": process_state,
+                    "exit_status": exit_status,
+                    "mtime": mtime,
+                    "called": set(),
+                },
             )
+            if called_pk is not None:
+                state["called"].add(called_pk)
+        return states
 
     def update(self, _=None):
-        """Refresh nodes based on the latest state of the root process and its children."""
-        for root_node in self._tree.nodes:
-            self._build_tree(root_node)
-            for tree_node in self._walk_tree(root_node):
-                self._update_tree_node(tree_node)
+        """Refresh nodes based on the latest state of the root process and its children.
+
+        The state of all the process nodes in the tree is fetched with a single query
+        per update, only the nodes modified since the last update are loaded again.
+        """
+        process_tree_nodes = [
+            tree_node
+            for tree_node in self._walk_tree(self._tree)
+            if isinstance(tree_node, AiidaProcessNodeTreeNode)
+        ]
+        if not process_tree_nodes:
+            return
+        states = self._query_process_states(
+            {tree_node.pk for tree_node in process_tree_nodes}
+        )
+
+        for tree_node in process_tree_nodes:
+            state = states.get(tree_node.pk)
+            if state is None:
+                continue
+            # The root nodes are always expanded, the other nodes only once
+            # they have been built upon selection or expansion.
+            if tree_node.is_built:
+                if not state["called"].issubset(tree_node.nodes_registry):
+                    self._build_tree(tree_node)
+            elif tree_node in self._tree.nodes:
+                self._build_tree(tree_node)
+            elif tree_node.nodes:
+                tree_node.nodes[0].set_num_called(len(state["called"]))
+            if state["mtime"] != tree_node.mtime:
+                self._update_tree_node(tree_node, state)
+
+    @staticmethod
+    def _index_key(tree_node):
+        if isinstance(tree_node, AiidaOutputsTreeNode):
+            return tree_node.parent_pk, tree_node.namespaces
+        if isinstance(tree_node, AiidaNodeTreeNode):
+            return tree_node.pk, None
+        return None
+
+    def _set_children(self, parent, children):
+        """Replace the children of the tree node and keep the index up to date."""
+        children = list(children)
+        if len(children) == len(parent.nodes) and all(
+            new is old for new, old in zip(children, parent.nodes)
+        ):
+            # Nothing changed, avoid syncing the children with the frontend.
+            return
+        previous = {id(node) for node in parent.nodes}
+        added = {id(node) for node in children}
+        for node in parent.nodes:
+            if id(node) not in added:
+                self._unindex_tree(node)
+        for node in children:
+            if id(node) not in previous:
+                self._index_tree(node)
+        with parent.hold_sync():
+            parent.nodes = children
+
+    def _index_tree(self, root):
+        for node in self._walk_tree(root):
+            key = self._index_key(node)
+            if key is not None:
+                self._index[key].append(node)
+
+    def _unindex_tree(self, root):
+        for node in self._walk_tree(root):
+            key = self._index_key(node)
+            if key is None:
+                continue
+            nodes = [indexed for indexed in self._index[key] if indexed is not node]
+            if nodes:
+                self._index[key] = nodes
+            else:
+                del self._index[key]
 
     def find_node(self, pk, namespaces=None):
         """Find a node by its pk and namespaces.
         If node is an output node, it is identified by the parent pk and namespaces, otherwise by the pk."""
-        for node in self._walk_tree(self._tree):
-            node_pk = (
-                node.parent_pk
-                if isinstance(node, AiidaOutputsTreeNode)
-                else getattr(node, "pk", None)
-            )
-            if node_pk == pk and getattr(node, "namespaces", None) == namespaces:
-                return node
-        raise KeyError(pk)
+        nodes = self._index.get((pk, namespaces))
+        if not nodes:
+            raise KeyError(pk)
+        return nodes[0]
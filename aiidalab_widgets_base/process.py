@@ -4,17 +4,22 @@
 # Built-in imports
 from __future__ import annotations
 
+import asyncio
+import functools
 import inspect
 import sys
 import threading
 import traceback
+import uuid
 import warnings
+from html import escape
 
 import ipywidgets as ipw
 import traitlets as tl
 from aiida import engine, orm
 
 # Local imports.
+from .loaders import LoadingWidget
 from .nodes import NodesTreeWidget
 
 
@@ -30,6 +35,7 @@ class SubmitButtonWidget(ipw.VBox):
         description="Submit",
         disable_after_submit=True,
         append_output=False,
+        asynchronous=False,
         **kwargs,
     ):
         """Submit Button widget.
@@ -43,6 +49,9 @@ class SubmitButtonWidget(ipw.VBox):
         disable_after_submit (bool): Whether to disable the button after the process was submitted.
 
         append_output (bool): Whether to clear widget output for each subsequent submission.
+
+        asynchronous (bool): Whether to generate the inputs and submit the process in a
+        background thread, so that the user interface stays responsive.
         """
 
         self.path_to_root = kwargs.get("path_to_root", "../")
@@ -64,13 +73,20 @@ class SubmitButtonWidget(ipw.VBox):
 
         self.disable_after_submit = disable_after_submit
         self.append_output = append_output
+        self.asynchronous = asynchronous
 
         self.btn_submit = ipw.Button(description=description, disabled=False)
         self.btn_submit.on_click(self.on_btn_submit_press)
+        self.submit_progress = LoadingWidget("Submitting", layout={"display": "none"})
         self.submit_out = ipw.HTML("")
         self._run_after_submitted = []
+        self._submission_thread = None
+        self._submission_done = threading.Event()
+        self._submission_done.set()
 
-        super().__init__(children=[self.btn_submit, self.submit_out])
+        super().__init__(
+            children=[self.btn_submit, self.submit_progress, self.submit_out]
+        )
 
     def on_click(self, function):
         self.btn_submit.on_click(function)
@@ -78,11 +94,76 @@ class SubmitButtonWidget(ipw.VBox):
     def on_btn_submit_press(self, _=None):
         """When submit button is pressed."""
 
+        if self._submission_thread is not None:
+            return  # a submission is already running
+
         if not self.append_output:
             self.submit_out.value = ""
 
+        if self.asynchronous:
+            self._submit_in_background()
+            return
+
         inputs = self.inputs_generator()
-        if inputs is None:
+        if inputs is not None and self.disable_after_submit:
+            self.btn_submit.disabled = True
+        self._show_submitted(self._submit(inputs) if inputs is not None else None)
+
+    def _submit(self, inputs):
+        if isinstance(inputs, engine.ProcessBuilder):
+            return engine.submit(inputs)
+        return engine.submit(self._process_class, **inputs)
+
+    def _submit_in_background(self):
+        """Generate the inputs and submit the process in a worker thread.
+
+        The button stays disabled until the submission is done, and the results
+        are shown from the thread of the event loop, if there is one running.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        def finish(process, error):
+            if loop is None:
+                self._finish_submission(process, error)
+            else:
+                loop.call_soon_threadsafe(self._finish_submission, process, error)
+
+        def submit():
+            try:
+                inputs = self.inputs_generator()
+                process = None if inputs is None else self._submit(inputs)
+            except Exception as exception:  # noqa: BLE001
+                finish(None, exception)
+            else:
+                finish(process, None)
+
+        self.btn_submit.disabled = True
+        self.submit_progress.layout.display = "flex"
+        self._submission_done.clear()
+        self._submission_thread = threading.Thread(target=submit, daemon=True)
+        self._submission_thread.start()
+
+    def _finish_submission(self, process, error):
+        try:
+            self._submission_thread = None
+            self.submit_progress.layout.display = "none"
+            self.btn_submit.disabled = process is not None and self.disable_after_submit
+            if error is None:
+                self._show_submitted(process)
+                return
+            message = f"SubmitButtonWidget: the submission failed: {escape(str(error))}"
+            if self.append_output:
+                self.submit_out.value += f"{message}<br>"
+            else:
+                self.submit_out.value = message
+        finally:
+            self._submission_done.set()
+
+    def _show_submitted(self, process):
+        if process is None:
             if self.append_output:
                 self.submit_out.value += (
                     "SubmitButtonWidget: did not recieve the process inputs.<br>"
@@ -92,12 +173,7 @@ class SubmitButtonWidget(ipw.VBox):
                     "SubmitButtonWidget: did not recieve the process inputs."
                 )
         else:
-            if self.disable_after_submit:
-                self.btn_submit.disabled = True
-            if isinstance(inputs, engine.ProcessBuilder):
-                self.process = engine.submit(inputs)
-            else:
-                self.process = engine.submit(self._process_class, **inputs)
+            self.process = process
 
             assert self.process is not None
             if self.append_output:
@@ -112,6 +188,17 @@ class SubmitButtonWidget(ipw.VBox):
             for func in self._run_after_submitted:
                 func(self.process)
 
+    def join(self, timeout=None):
+        """Wait until the asynchronous submission is finished and shown.
+
+        This includes the `on_submitted` functions. When an event loop is
+        running, the results are shown from its thread, so this must not be
+        called from that thread, e.g. from a notebook cell.
+
+        returns: False if the timeout expired, True otherwise
+        """
+        return self._submission_done.wait(timeout)
+
     def on_submitted(self, function):
         """Run functions after a process has been submitted successfully."""
         self._run_after_submitted.append(function)
@@ -128,10 +215,17 @@ class ProcessFollowerWidget(ipw.VBox):
         followers=None,
         update_interval=1.0,
         path_to_root="../",
+        event_source=None,
+        shared_monitor=False,
+        max_update_interval=None,
         **kwargs,
     ):
         """Initiate all the followers."""
         self._monitor = None
+        self._event_source = event_source
+        self._shared_monitor = shared_monitor
+        self.max_update_interval = max_update_interval
+        self._last_change = None
 
         self.process = process
         self._run_after_completed = []
@@ -154,8 +248,19 @@ class ProcessFollowerWidget(ipw.VBox):
         self.update()
 
     def update(self):
+        """Update the followers if the process or its descendants have changed.
+
+        Followers with an `always_update` attribute set to True are always updated.
+        """
+        last_change = (
+            None if self.process is None else ProcessMonitor.last_change(self.process)
+        )
+        changed = last_change is None or last_change != self._last_change
+        self._last_change = last_change
         for follower in self.followers:
-            follower.children[1].update()
+            widget = follower.children[1]
+            if changed or getattr(widget, "always_update", False):
+                widget.update()
 
     def follow(self, detach=False):
         """Initiate following the process with or without blocking."""
@@ -170,6 +275,9 @@ class ProcessFollowerWidget(ipw.VBox):
                 callbacks=[self.update],
                 on_sealed=self._run_after_completed,
                 timeout=self.update_interval,
+                event_source=self._event_source,
+                shared=self._shared_monitor,
+                max_timeout=self.max_update_interval,
             )
             ipw.dlink(
                 (self, "process"), (self._monitor, "value"), transform=lambda x: x.uuid
@@ -186,18 +294,292 @@ class ProcessFollowerWidget(ipw.VBox):
         self._run_after_completed.append(function)
 
 
+def _query_process_states(process_uuids):
+    """Return the (last change, sealed) state of each of the processes.
+
+    The last change is the latest modification time of the process and of the
+    processes it called, at any depth: the modification time of a workflow does
+    not change while the processes it called progress. The called processes of
+    all the processes are walked together, with one query per level of calls.
+    Deleted processes are missing from the returned dictionary.
+    """
+    queryb = orm.QueryBuilder().append(
+        orm.ProcessNode,
+        filters={"uuid": {"in": list(process_uuids)}},
+        project=["uuid", "id", "mtime", "attributes.sealed"],
+    )
+    last_changes = {}
+    sealed = {}
+    # The monitored processes each called process belongs to.
+    roots = {}
+    for process_uuid, pk, mtime, is_sealed in queryb.iterall():
+        last_changes[process_uuid] = mtime
+        sealed[process_uuid] = bool(is_sealed)
+        roots.setdefault(pk, set()).add(process_uuid)
+
+    while roots:
+        queryb = orm.QueryBuilder()
+        queryb.append(
+            orm.ProcessNode,
+            filters={"id": {"in": list(roots)}},
+            project=["id"],
+            tag="caller",
+        )
+        queryb.append(orm.ProcessNode, with_incoming="caller", project=["id", "mtime"])
+        called = {}
+        for caller_pk, pk, mtime in queryb.iterall():
+            for process_uuid in roots[caller_pk]:
+                last_changes[process_uuid] = max(last_changes[process_uuid], mtime)
+            called.setdefault(pk, set()).update(roots[caller_pk])
+        roots = called
+
+    return {
+        process_uuid: (last_change, sealed[process_uuid])
+        for process_uuid, last_change in last_changes.items()
+    }
+
+
+class LocalProcessEventSource:
+    """In-process source of process state change events.
+
+    A stand-in for the broadcasts of the communicator, e.g. for tests or for
+    processes run in the current interpreter: call `notify` when a process changes.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, process_uuid, callback):
+        """Call `callback` whenever the process changes, return the subscription id."""
+        identifier = uuid.uuid4().hex
+        with self._lock:
+            self._subscribers[identifier] = (process_uuid, callback)
+        return identifier
+
+    def unsubscribe(self, identifier):
+        with self._lock:
+            self._subscribers.pop(identifier, None)
+
+    def notify(self, process_uuid):
+        """Notify the subscribers that the process has changed."""
+        with self._lock:
+            callbacks = [
+                callback
+                for subscribed_uuid, callback in self._subscribers.values()
+                if subscribed_uuid == process_uuid
+            ]
+        for callback in callbacks:
+            callback()
+
+
+class CommunicatorProcessEventSource:
+    """Source of the state change events broadcasted by the processes.
+
+    The processes run by the daemon broadcast their state changes through the
+    communicator of the AiiDA profile, which requires a running message broker.
+    """
+
+    def __init__(self, communicator=None):
+        self._communicator = communicator
+
+    @property
+    def communicator(self):
+        if self._communicator is None:
+            from aiida.manage import get_manager
+
+            self._communicator = get_manager().get_communicator()
+        return self._communicator
+
+    def subscribe(self, process_uuid, callback):
+        """Call `callback` whenever the process changes, return the subscription id."""
+        from kiwipy import BroadcastFilter
+
+        # The processes broadcast their state changes with their pk as sender.
+        subscriber = BroadcastFilter(
+            lambda *_args, **_kwargs: callback(), sender=orm.load_node(process_uuid).pk
+        )
+        return self.communicator.add_broadcast_subscriber(subscriber)
+
+    def unsubscribe(self, identifier):
+        self.communicator.remove_broadcast_subscriber(identifier)
+
+
+class ProcessMonitorService:
+    """Monitor many processes from a single thread.
+
+    The state of all the monitored processes, including the processes they
+    called, is fetched with one query per level of calls at every tick, and
+    only the subscribers whose process changed are notified.
+    The thread is started with the first subscription and stops once there are
+    no subscriptions left.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def instance(cls):
+        """Return the service shared by all the monitors of the interpreter."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def subscribe(self, process_uuid, callback, interval=None):
+        """Call `callback(state)` whenever the process changes.
+
+        The processes are checked every `interval` seconds, by default the
+        `interval` of the service, or more often if another subscriber
+        requested a shorter interval.
+
+        The state is a (last change, sealed) tuple, where the last change is the
+        latest modification time of the process and of the processes it called,
+        or None if the process was deleted.
+        The subscription ends once the process is sealed or deleted.
+        Return the subscription id.
+        """
+        identifier = uuid.uuid4().hex
+        with self._lock:
+            self._subscriptions[identifier] = {
+                "process_uuid": process_uuid,
+                "callback": callback,
+                "interval": self.interval if interval is None else interval,
+                "mtime": None,
+            }
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        # Notify the new subscriber without waiting for the next tick.
+        self._wakeup.set()
+        return identifier
+
+    def unsubscribe(self, identifier):
+        with self._lock:
+            self._subscriptions.pop(identifier, None)
+
+    def join(self):
+        """Wait until all the subscriptions have ended."""
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            # Clear before reading the subscriptions, so no new one is missed.
+            self._wakeup.clear()
+            with self._lock:
+                if not self._subscriptions:
+                    self._thread = None
+                    return
+                subscriptions = dict(self._subscriptions)
+            interval = min(sub["interval"] for sub in subscriptions.values())
+            try:
+                self._tick(subscriptions)
+            except Exception:  # noqa: BLE001
+                # Keep monitoring, e.g. if the database was briefly unavailable.
+                warnings.warn(
+                    f"The process monitor service failed:\n{traceback.format_exc()}",
+                    stacklevel=2,
+                )
+            self._wakeup.wait(timeout=interval)
+
+    def _tick(self, subscriptions):
+        states = _query_process_states(
+            {sub["process_uuid"] for sub in subscriptions.values()}
+        )
+        for identifier, subscription in subscriptions.items():
+            state = states.get(subscription["process_uuid"])
+            if state is not None and not state[1]:
+                if state[0] == subscription["mtime"]:
+                    continue
+                subscription["mtime"] = state[0]
+            else:
+                self.unsubscribe(identifier)
+            try:
+                subscription["callback"](state)
+            except Exception:  # noqa: BLE001
+                warnings.warn(
+                    f"The process monitor callback failed:\n{traceback.format_exc()}",
+                    stacklevel=2,
+                )
+
+
 class ProcessMonitor(tl.HasTraits):
-    """Monitor a process and execute callback functions at specified intervals."""
+    """Monitor a process and execute callback functions at specified intervals.
+
+    If an `event_source` is given, e.g. `CommunicatorProcessEventSource()`, the
+    callbacks are only executed when the process has changed. The process is then
+    also checked every `fallback_timeout` seconds, in case events are missed.
+    If the subscription fails, the monitor falls back to polling.
+
+    With `shared=True`, no thread is started for the monitor, the process is
+    monitored by the `ProcessMonitorService` and the callbacks are only executed
+    when the process has changed. The process is checked every `timeout` seconds,
+    or more often if another monitor of the service requested a shorter timeout.
+
+    With a `max_timeout`, the polling is adaptive: the process is checked every
+    `timeout` seconds after it has changed, and the interval grows by
+    `backoff_factor` while it stays unchanged, up to `max_timeout` seconds.
+    The callbacks are then only executed when the process has changed.
+    The number of polls, and of polls skipped compared to polling every
+    `timeout` seconds, are counted in `stats`.
+
+    In all these modes, the process has changed when it or any of the processes
+    it called, at any depth, has been modified. The events are only received for
+    the process itself, so with an `event_source` the changes of the called
+    processes are only detected by the checks every `fallback_timeout` seconds.
+    """
 
     value = tl.Unicode(allow_none=True)
 
-    def __init__(self, callbacks=None, on_sealed=None, timeout=None, **kwargs):
+    def __init__(
+        self,
+        callbacks=None,
+        on_sealed=None,
+        timeout=None,
+        event_source=None,
+        fallback_timeout=60.0,
+        shared=False,
+        max_timeout=None,
+        backoff_factor=2.0,
+        **kwargs,
+    ):
+        if shared and event_source is not None:
+            msg = "The shared monitor service can not be used with an event source."
+            raise ValueError(msg)
+        if max_timeout is not None and (
+            max_timeout < (1.0 if timeout is None else timeout) or backoff_factor < 1
+        ):
+            msg = (
+                "The max_timeout must not be smaller than the timeout and the "
+                "backoff_factor must not be smaller than 1."
+            )
+            raise ValueError(msg)
         self.callbacks = [] if callbacks is None else list(callbacks)
         self.on_sealed = [] if on_sealed is None else list(on_sealed)
         self.timeout = 1.0 if timeout is None else timeout
+        self.event_source = event_source
+        self.fallback_timeout = fallback_timeout
+        self.shared = shared
+        self.max_timeout = max_timeout
+        self.backoff_factor = backoff_factor
+        self.stats = {"polls": 0, "skipped_polls": 0}
+
+        self._disabled_funcs = set()
+        self._shared_subscription = None
+        self._shared_monitor_done = threading.Event()
 
         self._monitor_thread = None
         self._monitor_thread_stop = threading.Event()
+        self._monitor_thread_wakeup = threading.Event()
         self._monitor_thread_lock = threading.Lock()
 
         self.log_widget: ipw.Output | None = kwargs.pop("log_widget", None)
@@ -210,17 +592,34 @@ class ProcessMonitor(tl.HasTraits):
         monitor if exist. Start a new one in thread."""
         process_uuid = change["new"]
 
+        if self._shared_subscription is not None:
+            ProcessMonitorService.instance().unsubscribe(self._shared_subscription)
+            self._shared_subscription = None
+            self._shared_monitor_done.set()
+
         # stop thread (if running)
         if self._monitor_thread is not None:
             with self._monitor_thread_lock:
                 self._monitor_thread_stop.set()
+                self._monitor_thread_wakeup.set()
                 self._monitor_thread.join()
 
         if process_uuid is None:
             return
 
+        if self.shared:
+            self._disabled_funcs = set()
+            self._shared_monitor_done.clear()
+            self._shared_subscription = ProcessMonitorService.instance().subscribe(
+                process_uuid,
+                functools.partial(self._on_process_changed, process_uuid),
+                interval=self.timeout,
+            )
+            return
+
         with self._monitor_thread_lock:
             self._monitor_thread_stop.clear()
+            self._monitor_thread_wakeup.clear()
             self._monitor_thread = threading.Thread(
                 target=self._monitor_process, args=(process_uuid,)
             )
@@ -230,34 +629,25 @@ class ProcessMonitor(tl.HasTraits):
         assert process_uuid is not None
         process = orm.load_node(process_uuid)
 
-        disabled_funcs = set()
+        self._disabled_funcs = set()
+        _run = functools.partial(self._run_callbacks, process_uuid)
 
-        def _run(funcs):
-            for func in funcs:
-                # skip all functions that had previously raised an exception
-                if func in disabled_funcs:
-                    continue
-
-                try:
-                    if len(inspect.signature(func).parameters) > 0:
-                        func(process_uuid)
-                    else:
-                        func()
-                except Exception:  # ruff: ignore[BLE001]
-                    if self.log_widget:
-                        with self.log_widget:
-                            traceback.print_exc(file=sys.stdout)
-                    warnings.warn(
-                        f"WARNING: The callback function {func.__name__!r} was disabled due to an error:\n{traceback.format_exc()}",
-                        stacklevel=2,
-                    )
-                    disabled_funcs.add(func)
+        event_source = self.event_source
+        subscription = self._subscribe(event_source, process_uuid)
+        try:
+            if subscription is None and self.max_timeout is None:
+                while not process.is_sealed:
+                    _run(self.callbacks)
 
-        while not process.is_sealed:
-            _run(self.callbacks)
-
-            if self._monitor_thread_stop.wait(timeout=self.timeout):
-                break  # thread was signaled to be stopped
+                    if self._monitor_thread_stop.wait(timeout=self.timeout):
+                        break  # thread was signaled to be stopped
+            else:
+                self._wait_for_changes(
+                    process_uuid, _run, event_driven=subscription is not None
+                )
+        finally:
+            if event_source is not None and subscription is not None:
+                event_source.unsubscribe(subscription)
 
         # Final update:
         _run(self.callbacks)
@@ -266,9 +656,99 @@ class ProcessMonitor(tl.HasTraits):
         if process.is_sealed:
             _run(self.on_sealed)
 
+    def _run_callbacks(self, process_uuid, funcs):
+        for func in funcs:
+            # skip all functions that had previously raised an exception
+            if func in self._disabled_funcs:
+                continue
+
+            try:
+                if len(inspect.signature(func).parameters) > 0:
+                    func(process_uuid)
+                else:
+                    func()
+            except Exception:  # ruff: ignore[BLE001]
+                if self.log_widget:
+                    with self.log_widget:
+                        traceback.print_exc(file=sys.stdout)
+                warnings.warn(
+                    f"WARNING: The callback function {func.__name__!r} was disabled due to an error:\n{traceback.format_exc()}",
+                    stacklevel=2,
+                )
+                self._disabled_funcs.add(func)
+
+    def _on_process_changed(self, process_uuid, state):
+        """Run the callbacks when notified by the shared monitor service."""
+        if process_uuid != self.value:
+            return  # the monitored process has been replaced in the meantime
+        if state is not None:
+            self._run_callbacks(process_uuid, self.callbacks)
+            if state[1]:
+                self._run_callbacks(process_uuid, self.on_sealed)
+        if state is None or state[1]:
+            self._shared_monitor_done.set()
+
+    def _subscribe(self, event_source, process_uuid):
+        """Subscribe to the changes of the process, return None if not possible."""
+        if event_source is None:
+            return None
+        try:
+            return event_source.subscribe(process_uuid, self._monitor_thread_wakeup.set)
+        except Exception as exception:  # noqa: BLE001
+            warnings.warn(
+                f"Could not subscribe to the changes of process {process_uuid}, "
+                f"falling back to polling: {exception}",
+                stacklevel=2,
+            )
+            return None
+
+    @staticmethod
+    def last_change(process):
+        """Return the latest modification time of the process and its called processes.
+
+        This is a cheap probe to check whether anything changed, only the
+        modification times are fetched, with one query per level of calls.
+        """
+        state = _query_process_states([process.uuid]).get(process.uuid)
+        return None if state is None else state[0]
+
+    def _wait_for_changes(self, process_uuid, run, event_driven):
+        """Run the callbacks whenever the process changes, until it is sealed.
+
+        The process is checked when an event is received, or otherwise after
+        an interval that grows while the process stays unchanged. The changes
+        of the processes it called count as changes of the process.
+        """
+        last_change = None
+        interval = self.timeout
+        # Without a maximum, the interval does not grow.
+        max_timeout = self.timeout if self.max_timeout is None else self.max_timeout
+        while True:
+            state = _query_process_states([process_uuid]).get(process_uuid)
+            self.stats["polls"] += 1
+            if state is None or state[1]:
+                return  # the process was deleted or is sealed
+            if state[0] != last_change:
+                last_change = state[0]
+                run(self.callbacks)
+                interval = self.timeout
+            elif not event_driven:
+                interval = min(interval * self.backoff_factor, max_timeout)
+
+            self._monitor_thread_wakeup.wait(
+                timeout=self.fallback_timeout if event_driven else interval
+            )
+            self._monitor_thread_wakeup.clear()
+            if self._monitor_thread_stop.is_set():
+                return  # thread was signaled to be stopped
+            if not event_driven:
+                self.stats["skipped_polls"] += round(interval / self.timeout) - 1
+
     def join(self):
         if self._monitor_thread is not None:
             self._monitor_thread.join()
+        if self._shared_subscription is not None:
+            self._shared_monitor_done.wait()
 
 
 class ProcessNodesTreeWidget(ipw.VBox):
@@ -277,10 +757,10 @@ class ProcessNodesTreeWidget(ipw.VBox):
     value = tl.Unicode(allow_none=True)
     selected_nodes = tl.Tuple(read_only=True).tag(trait=tl.Instance(orm.Node))
 
-    def __init__(self, title="Process Tree", **kwargs):
+    def __init__(self, title="Process Tree", lazy=False, **kwargs):
         self.title = title  # needed for ProcessFollowerWidget
 
-        self._tree = NodesTreeWidget()
+        self._tree = NodesTreeWidget(lazy=lazy)
         self._tree.observe(self._observe_tree_selected_nodes, ["selected_nodes"])
         super().__init__(children=[self._tree], **kwargs)
         self.update()
@@ -1,10 +1,21 @@
 """Module to provide functionality to import structures."""
 
+import asyncio
+import contextlib
+import dataclasses
 import datetime
 import functools
+import hashlib
+import html
 import io
+import json
+import multiprocessing
+import os
 import pathlib
 import tempfile
+import threading
+import time
+import weakref
 
 import ase
 import ase.cell
@@ -14,17 +25,22 @@ import ipywidgets as ipw
 import numpy as np
 import traitlets as tl
 from aiida import common, engine, orm, plugins
+from aiida.common.escaping import escape_for_sql_like
+from aiida.manage import get_manager
+from aiida.orm.entities import EntityTypes
 
 # Local imports
 from .data import FunctionalGroupSelectorWidget
 from .utils import (
     StatusHTML,
-    _restore_spglib_old_error_handling,
-    _set_spglib_old_error_handling,
     exceptions,
     get_ase_from_file,
+    get_elements,
     get_formula,
+    get_structure_hash,
+    symmetry,
 )
+from .utils.neighbors import NeighborList
 from .viewers import StructureDataViewer
 
 CifData = plugins.DataFactory("core.cif")
@@ -61,6 +77,7 @@ class StructureManagerWidget(ipw.VBox):
         editors=None,
         storable=True,
         node_class=None,
+        deduplicate=False,
         **kwargs,
     ):
         """
@@ -74,7 +91,12 @@ class StructureManagerWidget(ipw.VBox):
             node_class(str): AiiDA node class for storing the structure.
                 Possible values: 'StructureData', 'CifData' or None (let the user decide).
                 Note: If your workflows require a specific node class, better fix it here.
+
+            deduplicate(bool): Whether to reuse an identical structure that is already stored
+                in AiiDA instead of storing the structure again. Structures are compared
+                through the `structure_hash` extra.
         """
+        self.deduplicate = deduplicate
 
         # History of modifications
         self.history = []
@@ -98,6 +120,20 @@ class StructureManagerWidget(ipw.VBox):
         self.btn_store = ipw.Button(description="Store in AiiDA", disabled=True)
         self.btn_store.on_click(self.store_structure)
 
+        # Structures that are stored together with `store_pending`.
+        self.pending = []
+        self.btn_add_pending = ipw.Button(
+            description="Add to pending",
+            tooltip="Keep the structure to store it later with the other pending ones",
+            disabled=True,
+        )
+        self.btn_add_pending.on_click(self.add_pending)
+        tl.dlink((self.btn_store, "disabled"), (self.btn_add_pending, "disabled"))
+        self.btn_store_pending = ipw.Button(
+            description="Store all pending (0)", disabled=True
+        )
+        self.btn_store_pending.on_click(self.store_pending)
+
         # Label and description that are stored along with the new structure.
         self.structure_label = ipw.Text(description="Label")
         self.structure_description = ipw.Text(description="Description")
@@ -112,7 +148,11 @@ class StructureManagerWidget(ipw.VBox):
         tl.link((data_format, "label"), (self, "node_class"))
 
         # Store button, store class selector, description.
-        store_and_description = [self.btn_store] if storable else []
+        store_and_description = (
+            [self.btn_store, self.btn_add_pending, self.btn_store_pending]
+            if storable
+            else []
+        )
 
         if node_class is None:
             store_and_description.append(data_format)
@@ -229,6 +269,13 @@ class StructureManagerWidget(ipw.VBox):
                 f"Already stored in AiiDA [{self.structure_node}], skipping..."
             )
             return
+        self._set_structure_hash(self.structure_node, self.structure)
+        if duplicate := self._find_duplicate(self.structure_node):
+            self.set_trait("structure_node", duplicate)
+            self.output.value = (
+                f"Identical structure already stored in AiiDA [{duplicate}], using it"
+            )
+            return
         self.btn_store.disabled = True
         self.structure_node.label = self.structure_label.value
         self.structure_label.disabled = True
@@ -250,6 +297,114 @@ class StructureManagerWidget(ipw.VBox):
             structure_node = self.structure_node.store()
         self.output.value = f"Stored in AiiDA [{structure_node}]"
 
+    def add_pending(self, _=None):
+        """Add the current structure to the structures stored by `store_pending`."""
+        node = self.structure_node
+        if node is None or node.is_stored:
+            return
+        if any(pending is node for pending, _ in self.pending):
+            self.output.value = "The structure is already pending, skipping..."
+            return
+        node.label = self.structure_label.value
+        node.description = self.structure_description.value
+        self._set_structure_hash(node, self.structure)
+        source = self.input_structure
+        if not (isinstance(source, orm.Data) and source.is_stored):
+            source = None
+        self.pending.append((node, source))
+        self._update_pending_buttons()
+        formula = self.structure.get_chemical_formula()
+        self.output.value = f"Added {formula} to the pending structures"
+
+    def store_pending(self, _=None):
+        """Store all the pending structures in a single database transaction.
+
+        The structures modified from a stored node are linked to it through
+        a `user_modifications` calcfunction, as in `store_structure`, but
+        a single calcfunction is run for all the structures edited from
+        the same source.
+
+        returns: list of the stored structure nodes
+        """
+        if not self.pending:
+            return []
+        pending = self.pending
+        # If the transaction is rolled back, the nodes still believe they are
+        # stored, so the queue is restored with unstored copies of them.
+        copies = [(node.clone(), source) for node, source in pending]
+
+        nodes = []
+        modified = {}
+        storage = get_manager().get_profile_storage()
+        try:
+            with storage.transaction():
+                for index, (node, source) in enumerate(pending, 1):
+                    self.output.value = f"Storing structure {index}/{len(pending)}"
+                    if duplicate := self._find_duplicate(node):
+                        nodes.append(duplicate)
+                        continue
+                    nodes.append(node)
+                    if source is None:
+                        node.store()
+                    else:
+                        modified.setdefault(source.pk, (source, []))[1].append(node)
+
+                for source, structures in modified.values():
+                    self._store_modifications(source, structures)
+        except Exception as error:  # noqa: BLE001
+            for (node, _), (copy, _) in zip(pending, copies):
+                if node is self.structure_node:
+                    self.set_trait("structure_node", copy)
+            self.pending = copies
+            self.output.value = (
+                f"Could not store the pending structures: {html.escape(str(error))}"
+            )
+            return []
+
+        self.pending = []
+        self._update_pending_buttons()
+        self.output.value = f"Stored {len(nodes)} structures in AiiDA"
+        return nodes
+
+    @staticmethod
+    def _store_modifications(source, structures):
+        """Store the structures edited from the source through a calcfunction."""
+
+        @engine.calcfunction
+        def user_modifications(source_structure):
+            return {
+                f"result_{index}" if index else "result": node
+                for index, node in enumerate(structures)
+            }
+
+        user_modifications(source)
+
+    @staticmethod
+    def _set_structure_hash(node, structure):
+        """Set the `structure_hash` extra of the node that is about to be stored.
+
+        The hash is computed from the ASE structure, since not every node can
+        be converted back to ASE, e.g. a `CifData` of a molecule without a cell.
+        """
+        node.base.extras.set("structure_hash", get_structure_hash(structure))
+
+    def _find_duplicate(self, node):
+        """Find a stored node with the same `structure_hash` extra as the node.
+
+        returns: the identical stored node if deduplication is enabled, or None
+        """
+        if not self.deduplicate:
+            return None
+        queryb = orm.QueryBuilder().append(
+            type(node),
+            filters={"extras.structure_hash": node.base.extras.get("structure_hash")},
+        )
+        return queryb.first(flat=True)
+
+    def _update_pending_buttons(self):
+        self.btn_store_pending.description = f"Store all pending ({len(self.pending)})"
+        self.btn_store_pending.disabled = not self.pending
+
     def undo(self, _=None):
         """Undo modifications."""
         self.structure_set_by_undo = True
@@ -486,11 +641,22 @@ class StructureUploadWidget(ipw.VBox):
 
 
 class StructureExamplesWidget(ipw.VBox):
-    """Class to provide example structures for selection."""
+    """Class to provide example structures for selection.
+
+    Parsed examples are cached in memory and, if the example folder is writable,
+    in compact `.npz` files next to the sources, so that selecting an example
+    again or in another session does not parse the file. Use `warm_up` to parse
+    the first examples in the background right after the widget is created.
+    """
 
     structure = tl.Instance(ase.Atoms, allow_none=True)
 
-    def __init__(self, examples, title="", **kwargs):
+    PREPARSED_SUFFIX = ".npz"
+
+    _parsed_examples = {}
+    _parsed_examples_lock = threading.Lock()
+
+    def __init__(self, examples, title="", warm_up=0, **kwargs):
         self.title = title
         self.on_structure_selection = lambda _structure_ase, _name: None
         self._select_structure = ipw.Dropdown(
@@ -499,6 +665,14 @@ class StructureExamplesWidget(ipw.VBox):
         self._select_structure.observe(self._on_select_structure, names=["value"])
         super().__init__(children=[self._select_structure], **kwargs)
 
+        self._warm_up_thread = None
+        if warm_up:
+            filenames = [filename for _, filename in examples[:warm_up]]
+            self._warm_up_thread = threading.Thread(
+                target=self.preparse_examples, args=(filenames,), daemon=True
+            )
+            self._warm_up_thread.start()
+
     @staticmethod
     def get_example_structures(examples):
         """Get the list of example structures."""
@@ -508,11 +682,106 @@ class StructureExamplesWidget(ipw.VBox):
             )
         return [("Select structure", False), *examples]
 
+    @classmethod
+    def preparse_examples(cls, filenames):
+        """Parse the example files and store them in the caches."""
+        for filename in filenames:
+            try:
+                cls.load_example(filename)
+            except ValueError:
+                # Reported when the example is selected.
+                continue
+
+    @classmethod
+    def load_example(cls, filename):
+        """Return the first structure of the example file, using the caches.
+
+        raises: ValueError if the structure cannot be read
+        """
+        try:
+            path = pathlib.Path(filename).resolve()
+            stat = path.stat()
+        except (OSError, TypeError):
+            # Not a regular file, nothing to cache.
+            return get_ase_from_file(filename)[0]
+
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with cls._parsed_examples_lock:
+            structure = cls._parsed_examples.get(key)
+        if structure is None:
+            preparsed = path.with_name(path.name + cls.PREPARSED_SUFFIX)
+            structure = cls._read_preparsed(preparsed, key)
+            if structure is None:
+                structure = get_ase_from_file(path)[0]
+                cls._write_preparsed(preparsed, key, structure)
+            with cls._parsed_examples_lock:
+                cls._parsed_examples[key] = structure
+        return structure.copy()
+
+    @staticmethod
+    def _read_preparsed(preparsed, key):
+        """Read the preparsed structure if it was created from the current source."""
+        try:
+            with np.load(preparsed, allow_pickle=False) as data:
+                if data["source"].tolist() != [str(key[1]), str(key[2])]:
+                    return None
+                structure = ase.Atoms(
+                    numbers=data["numbers"],
+                    positions=data["positions"],
+                    cell=data["cell"],
+                    pbc=data["pbc"],
+                    info=json.loads(str(data["info"])),
+                )
+                for name in data.files:
+                    if name.startswith("array_"):
+                        structure.new_array(name[len("array_") :], data[name])
+        except (OSError, ValueError, KeyError):
+            return None
+        return structure
+
+    @staticmethod
+    def _write_preparsed(preparsed, key, structure):
+        """Store the arrays of the structure next to the source, if possible."""
+        # Structures that cannot be stored in this simple format
+        # are only cached in memory.
+        arrays = {
+            f"array_{name}": array
+            for name, array in structure.arrays.items()
+            if name not in ("numbers", "positions")
+        }
+        if structure.constraints or any(
+            array.dtype == object for array in arrays.values()
+        ):
+            return
+        try:
+            info = json.dumps(structure.info)
+        except TypeError:
+            return
+        try:
+            with tempfile.NamedTemporaryFile(
+                dir=preparsed.parent, suffix=".tmp", delete=False
+            ) as handle:
+                np.savez(
+                    handle,
+                    source=np.array([str(key[1]), str(key[2])]),
+                    numbers=structure.numbers,
+                    positions=structure.positions,
+                    cell=structure.cell.array,
+                    pbc=structure.pbc,
+                    info=np.array(info),
+                    **arrays,
+                )
+            os.chmod(handle.name, 0o644)
+            os.replace(handle.name, preparsed)
+        except OSError:
+            # The example folder is not writable, the memory cache is enough.
+            return
+
     def _on_select_structure(self, change=None):
         """When structure is selected."""
 
         self.structure = (
-            get_ase_from_file(self._select_structure.value)[0]
+            self.load_example(self._select_structure.value)
             if self._select_structure.value
             else None
         )
@@ -522,6 +791,180 @@ class StructureExamplesWidget(ipw.VBox):
         return None
 
 
+class FormulaIndexer:
+    """Add `formula`, `elements` and `structure_hash` extras to stored structures.
+
+    Structures are processed in batches ordered by PK and the extras of a whole
+    batch are written with a single bulk update. Only structures that lack the
+    extras are queried, so indexing resumes where it left off, even across sessions.
+    The other extras of the structures are read again right before the update,
+    so only the extras set at the very same time by another process can be lost.
+    """
+
+    # Formula of the structures that could not be read.
+    UNREADABLE_FORMULA = "(unreadable)"
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, query_types, batch_size=500):
+        self.query_types = tuple(query_types)
+        self.batch_size = batch_size
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    @classmethod
+    def for_types(cls, query_types):
+        """Return the indexer shared by everyone searching for the given node types."""
+        key = tuple(query_types)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(key)
+            return cls._instances[key]
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start indexing in the background unless it is running already."""
+        with self._thread_lock:
+            if self.is_running:
+                return
+            self._thread = threading.Thread(target=self.index, daemon=True)
+            self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def index(self):
+        """Index all the structures that do not have the extras yet."""
+        last_pk = 0
+        while batch := self._next_batch(last_pk):
+            last_pk = batch[-1].pk
+            self._store_formulas(batch)
+
+    def _next_batch(self, last_pk):
+        queryb = orm.QueryBuilder()
+        queryb.append(
+            self.query_types,
+            filters={
+                "id": {">": last_pk},
+                "or": [
+                    {"extras": {"!has_key": "formula"}},
+                    {"extras": {"!has_key": "elements"}},
+                    {"extras": {"!has_key": "structure_hash"}},
+                ],
+            },
+            tag="structures",
+        )
+        queryb.order_by({"structures": {"id": "asc"}})
+        return queryb.limit(self.batch_size).all(flat=True)
+
+    @classmethod
+    def _store_formulas(cls, nodes):
+        new_extras = {}
+        for node in nodes:
+            # We're catching broadly since reading a structure out of a broken
+            # node can fail in many ways, and one such node must not stall the indexer.
+            try:
+                extras = {"formula": get_formula(node), "elements": get_elements(node)}
+                # Trajectories have no single geometry to deduplicate on.
+                extras["structure_hash"] = (
+                    None
+                    if isinstance(node, TrajectoryData)
+                    else get_structure_hash(node)
+                )
+            except Exception:  # noqa: BLE001
+                # Mark the node as indexed, so that it is not read again.
+                extras = {
+                    "formula": cls.UNREADABLE_FORMULA,
+                    "elements": [],
+                    "structure_hash": None,
+                }
+            new_extras[node.pk] = extras
+        if not new_extras:
+            return
+
+        # The bulk update replaces all the extras, read the current ones right before.
+        storage = get_manager().get_profile_storage()
+        with storage.transaction():
+            queryb = orm.QueryBuilder().append(
+                orm.Node,
+                filters={"id": {"in": list(new_extras)}},
+                project=["id", "extras"],
+            )
+            rows = [
+                {"id": pk, "extras": {**(extras or {}), **new_extras[pk]}}
+                for pk, extras in queryb.all()
+            ]
+            storage.bulk_update(EntityTypes.NODE, rows)
+
+
+def _without_incoming_links(qbuild, tag, node_class):
+    """Restrict the query to the nodes of `tag` that have no incoming link.
+
+    The QueryBuilder cannot express this in a single query. If the storage backend
+    builds SQLAlchemy queries, a NOT EXISTS subquery on the links is added to the
+    SQL query. This relies on the internals of the backend, so if they are not
+    as expected, the nodes with an incoming link are queried first and excluded.
+    """
+    if not _add_no_incoming_link_subquery(qbuild, tag):
+        with_incoming = (
+            orm.QueryBuilder()
+            .append(node_class, project=["id"], tag=tag)
+            .append(orm.Node, with_outgoing=tag)
+        )
+        if pks := set(with_incoming.all(flat=True)):
+            qbuild.add_filter(tag, {"id": {"!in": list(pks)}})
+    return qbuild
+
+
+def _add_no_incoming_link_subquery(qbuild, tag):
+    """Add a NOT EXISTS subquery on the links to the SQL query of the QueryBuilder.
+
+    returns: False if the storage backend does not support it, True otherwise
+    """
+    try:
+        import sqlalchemy as sa
+    except ImportError:
+        return False
+
+    impl = getattr(qbuild, "_impl", None)
+    build_query = getattr(impl, "get_query", None)
+    link = getattr(impl, "Link", None)
+    if build_query is None or link is None:
+        return False
+
+    def add_subquery(built, data):
+        node = built.tag_to_alias[tag]
+        no_incoming_link = ~sa.exists().where(link.output_id == node.id)
+        # SQLAlchemy does not allow filtering after LIMIT/OFFSET, reapply them.
+        query = built.query.limit(None).offset(None).filter(no_incoming_link)
+        query = query.limit(data.get("limit")).offset(data.get("offset"))
+        return dataclasses.replace(built, query=query)
+
+    # The backend caches the built query, the filtered one is cached alongside.
+    # Filtering it right away checks that the backend internals are as expected.
+    data = qbuild.as_dict()
+    try:
+        built = build_query(data)
+        cache = {"built": built, "filtered": add_subquery(built, data)}
+    except Exception:  # noqa: BLE001
+        return False
+
+    def get_query(data):
+        built = build_query(data)
+        if cache["built"] is not built:
+            cache["built"] = built
+            cache["filtered"] = add_subquery(built, data)
+        return cache["filtered"]
+
+    impl.get_query = get_query
+    return True
+
+
 class StructureBrowserWidget(ipw.VBox):
     """Class to query for structures stored in the AiiDA database.
 
@@ -529,27 +972,52 @@ class StructureBrowserWidget(ipw.VBox):
     :type title: string
     :param query_types: A tuple of Data node types that are searched (default: StructureData, CifData)
     :type query_types: tuple
+    :param page_size: Number of structures shown per page of results
+    :type page_size: int
     """
 
     structure = tl.Union(
         [tl.Instance(ase.Atoms), tl.Instance(orm.Data)], allow_none=True
     )
 
-    def __init__(self, title="", query_types=None):
+    # Shown instead of the chemical formula until `FormulaIndexer` gets to the node.
+    FORMULA_PLACEHOLDER = "(formula pending)"
+
+    # Delay (in seconds) after the last keystroke before the search is run.
+    TYPEAHEAD_DELAY = 0.3
+
+    # Time (in seconds) for which the process labels are cached.
+    PROCESS_LABELS_TTL = 300
+    _process_labels_cache = {}
+    _process_labels_lock = threading.Lock()
+
+    # Columns needed to render a result label, see `_format_label`.
+    RESULT_PROJECTIONS = (
+        "id",
+        "ctime",
+        "extras.formula",
+        "node_type",
+        "label",
+        "description",
+    )
+
+    def __init__(self, title="", query_types=None, page_size=50):
         self.title = title
+        self.page_size = page_size
+        self._query = None
+        self._page = 0
+        self._matches_count = 0
 
         # Structure objects we want to query for.
         if query_types:
             self.query_structure_type = query_types
         else:
             self.query_structure_type = (StructureData, CifData)
+        self._formula_indexer = FormulaIndexer.for_types(self.query_structure_type)
 
-        # Extracting available process labels.
-        qbuilder = orm.QueryBuilder().append(
-            (orm.CalcJobNode, orm.WorkChainNode), project="label"
-        )
+        # The process labels are only queried once the "calculated" mode is selected.
         self.drop_label = ipw.Dropdown(
-            options=sorted({"All"}.union({i[0] for i in qbuilder.iterall() if i[0]})),
+            options=["All"],
             value="All",
             description="Process Label",
             disabled=True,
@@ -558,16 +1026,12 @@ class StructureBrowserWidget(ipw.VBox):
         )
         self.drop_label.observe(self.search, names="value")
 
-        # Disable process labels selection if we are not looking for the calculated structures.
-        def disable_drop_label(change):
-            self.drop_label.disabled = change["new"] != "calculated"
-
         # Select structures kind.
         self.mode = ipw.RadioButtons(
             options=["all", "uploaded", "edited", "calculated"], layout={"width": "25%"}
         )
+        self.mode.observe(self._observe_mode, names="value")
         self.mode.observe(self.search, names="value")
-        self.mode.observe(disable_drop_label, names="value")
 
         # Date range.
         # Note: there is Date picker widget, but it currently does not work in Safari:
@@ -604,6 +1068,28 @@ class StructureBrowserWidget(ipw.VBox):
             layout={"border": "1px solid #fafafa", "padding": "1em"},
         )
 
+        # Typeahead search, the query is only sent once the user stops typing.
+        self._typeahead_timer = None
+        # Without a running event loop, the typeahead searches run on a timer thread.
+        self._search_lock = threading.RLock()
+        self._elements_warning = ""
+        self.search_text = ipw.Text(
+            value="",
+            placeholder="Formula, label or description",
+            description="Search:",
+            continuous_update=True,
+            style={"description_width": "120px"},
+        )
+        self.search_text.observe(self._observe_search_input, names="value")
+        self.search_elements = ipw.Text(
+            value="",
+            placeholder="e.g. Si O",
+            description="Containing elements:",
+            continuous_update=True,
+            style={"description_width": "initial"},
+        )
+        self.search_elements.observe(self._observe_search_input, names="value")
+
         h_line = ipw.HTML("<hr>")
         box = ipw.VBox(
             [
@@ -611,33 +1097,91 @@ class StructureBrowserWidget(ipw.VBox):
                 ipw.HBox([self.pk_input, self.load_button]),
                 self.info,
                 h_line,
+                ipw.HBox([self.search_text, self.search_elements]),
                 ipw.HBox([self.mode, self.drop_label]),
             ]
         )
 
         self.results = ipw.Dropdown(layout={"width": "900px"})
         self.results.observe(self._on_select_structure, names="value")
+
+        # Pagination of the search results.
+        self.btn_previous_page = ipw.Button(
+            icon="chevron-left",
+            tooltip="Previous page",
+            disabled=True,
+            layout={"width": "initial"},
+        )
+        self.btn_previous_page.on_click(self._on_previous_page)
+        self.btn_next_page = ipw.Button(
+            icon="chevron-right",
+            tooltip="Next page",
+            disabled=True,
+            layout={"width": "initial"},
+        )
+        self.btn_next_page.on_click(self._on_next_page)
+        self.page_info = ipw.HTML("")
+
         self.search()
-        super().__init__([box, h_line, self.results])
+        super().__init__(
+            [
+                box,
+                h_line,
+                self.results,
+                ipw.HBox([self.btn_previous_page, self.page_info, self.btn_next_page]),
+            ]
+        )
+
+    @classmethod
+    def get_process_labels(cls):
+        """Return the distinct labels of the processes that can create structures.
+
+        The labels are cached for `PROCESS_LABELS_TTL` seconds and shared by all
+        the widget instances.
+        """
+        profile = get_manager().get_profile().name
+        with cls._process_labels_lock:
+            now = time.monotonic()
+            cached = cls._process_labels_cache.get(profile)
+            if cached and now - cached[0] < cls.PROCESS_LABELS_TTL:
+                return cached[1]
+
+            qbuilder = orm.QueryBuilder().append(
+                (orm.CalcJobNode, orm.WorkChainNode),
+                filters={"label": {"!==": ""}},
+                project="label",
+            )
+            labels = sorted(qbuilder.distinct().all(flat=True))
+            cls._process_labels_cache[profile] = (now, labels)
+            return labels
+
+    def _observe_mode(self, change):
+        """Enable process labels selection when looking for calculated structures."""
+        if change["new"] == "calculated":
+            self.drop_label.options = ["All", *self.get_process_labels()]
+        self.drop_label.disabled = change["new"] != "calculated"
 
     def preprocess(self):
-        """Search structures in AiiDA database and add formula extra to them."""
+        """Add formula extra to all structures in AiiDA database that lack it.
 
-        queryb = orm.QueryBuilder()
-        queryb.append(
-            self.query_structure_type, filters={"extras": {"!has_key": "formula"}}
-        )
-        for item in queryb.all():  # iterall() would interfere with base.extras.set()
-            try:
-                formula = get_formula(item[0])
-                item[0].base.extras.set("formula", formula)
-            except ValueError:
-                pass
+        This blocks until all structures are indexed, `search` does not need it.
+        """
+        self._formula_indexer.start()
+        self._formula_indexer.join()
 
     def search(self, _=None):
         """Launch the search of structures in AiiDA database."""
-        self.preprocess()
+        # Index new structures in the background, the results show
+        # a placeholder for the formulas that are not available yet.
+        self._formula_indexer.start()
+
+        with self._search_lock:
+            self._query = self._build_query()
+            self._matches_count = self._query.count()
+            self._show_page(0)
 
+    def _build_query(self):
+        """Build the query for the structures matching the current search settings."""
         qbuild = orm.QueryBuilder()
 
         # If the date range is valid, use it for the search
@@ -660,16 +1204,26 @@ class StructureBrowserWidget(ipw.VBox):
         filters = {}
         filters["ctime"] = {"and": [{">": start_date}, {"<=": end_date}]}
 
+        if text := self.search_text.value.strip():
+            pattern = f"%{escape_for_sql_like(text)}%"
+            filters["or"] = [
+                {"extras.formula": {"ilike": pattern}},
+                {"label": {"ilike": pattern}},
+                {"description": {"ilike": pattern}},
+            ]
+
+        if elements := self._parse_elements():
+            filters["extras.elements"] = {"contains": elements}
+        structures = {
+            "tag": "structures",
+            "filters": filters,
+            "project": list(self.RESULT_PROJECTIONS),
+        }
+
         if self.mode.value == "uploaded":
-            qbuild2 = (
-                orm.QueryBuilder()
-                .append(self.query_structure_type, project=["id"], tag="structures")
-                .append(orm.Node, with_outgoing="structures")
-            )
-            processed_nodes = [n[0] for n in qbuild2.all()]
-            if processed_nodes:
-                filters["id"] = {"!in": processed_nodes}
-            qbuild.append(self.query_structure_type, filters=filters)
+            # Structures without any incoming link.
+            qbuild.append(self.query_structure_type, **structures)
+            _without_incoming_links(qbuild, "structures", self.query_structure_type)
 
         elif self.mode.value == "calculated":
             if self.drop_label.value == "All":
@@ -685,43 +1239,104 @@ class StructureBrowserWidget(ipw.VBox):
             qbuild.append(
                 self.query_structure_type,
                 with_incoming="calcjobworkchain",
-                filters=filters,
+                **structures,
             )
 
         elif self.mode.value == "edited":
-            qbuild.append(orm.CalcFunctionNode)
+            qbuild.append(orm.CalcFunctionNode, tag="calcfunction")
             qbuild.append(
                 self.query_structure_type,
-                with_incoming=orm.CalcFunctionNode,
-                filters=filters,
+                with_incoming="calcfunction",
+                **structures,
             )
 
         elif self.mode.value == "all":
-            qbuild.append(self.query_structure_type, filters=filters)
+            qbuild.append(self.query_structure_type, **structures)
+
+        # A structure can be reached through several links, hence `distinct()`.
+        # The `id` makes the order stable between pages with equal `ctime`.
+        qbuild.order_by({"structures": [{"ctime": "desc"}, {"id": "desc"}]})
+        return qbuild.distinct()
+
+    def _parse_elements(self):
+        """Return the valid chemical symbols typed in the elements search box."""
+        symbols = self.search_elements.value.replace(",", " ").split()
+        unknown = [s for s in symbols if s not in ase.data.atomic_numbers]
+        # Only replace the warning about unknown elements, not other messages.
+        warning = f"Unknown element(s): {', '.join(unknown)}." if unknown else ""
+        if warning or self.info.value == self._elements_warning:
+            self.info.value = warning
+        self._elements_warning = warning
+        return sorted({s for s in symbols if s not in unknown})
+
+    def _observe_search_input(self, _=None):
+        """Search again once there has been no typing for `TYPEAHEAD_DELAY` seconds."""
+        if self._typeahead_timer is not None:
+            self._typeahead_timer.cancel()
+        # Search from the event loop of the kernel, like the other widget callbacks.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._typeahead_timer = threading.Timer(self.TYPEAHEAD_DELAY, self.search)
+            self._typeahead_timer.start()
+        else:
+            self._typeahead_timer = loop.call_later(self.TYPEAHEAD_DELAY, self.search)
+
+    @property
+    def _pages_count(self):
+        return max(1, -(-self._matches_count // self.page_size))
 
-        qbuild.order_by({self.query_structure_type: {"ctime": "desc"}})
-        matches = {n[0] for n in qbuild.iterall()}
-        matches = sorted(matches, reverse=True, key=lambda n: n.ctime)
+    def _show_page(self, page):
+        """Fetch a single page of the search results and display it."""
+        with self._search_lock:
+            self._page = min(max(page, 0), self._pages_count - 1)
 
-        options = [(f"Select a Structure ({len(matches)} found)", False)]
-        for mch in matches:
-            options.append((self._format_node_label(mch), mch))
+            self._query.offset(self._page * self.page_size).limit(self.page_size)
+            options = [(f"Select a Structure ({self._matches_count} found)", False)]
+            for row in self._query.iterall():
+                options.append((self._format_label(*row), row[0]))
+            self.results.options = options
 
-        self.results.options = options
+        self.page_info.value = f"Page {self._page + 1} of {self._pages_count}"
+        self.btn_previous_page.disabled = self._page == 0
+        self.btn_next_page.disabled = self._page >= self._pages_count - 1
+
+    def _on_previous_page(self, _=None):
+        self._show_page(self._page - 1)
+
+    def _on_next_page(self, _=None):
+        self._show_page(self._page + 1)
 
     def _on_select_structure(self, _=None):
-        self.structure = self.results.value or None
+        self.structure = (
+            orm.load_node(self.results.value) if self.results.value else None
+        )
         self.pk_input.value = str(self.structure.pk) if self.structure else ""
 
-    @staticmethod
-    def _format_node_label(node):
-        label = f"PK: {node.pk}"
-        label += " | " + node.ctime.strftime("%Y-%m-%d %H:%M")
-        label += " | " + node.base.extras.get("formula", "")
-        label += " | " + node.node_type.split(".")[-2]
-        label += " | " + node.label
-        label += " | " + node.description
-        return label
+    @classmethod
+    def _format_label(cls, pk, ctime, formula, node_type, label, description):
+        """Format the label of a single search result from the projected columns."""
+        return " | ".join(
+            [
+                f"PK: {pk}",
+                ctime.strftime("%Y-%m-%d %H:%M"),
+                formula or cls.FORMULA_PLACEHOLDER,
+                node_type.split(".")[-2],
+                label,
+                description,
+            ]
+        )
+
+    @classmethod
+    def _format_node_label(cls, node):
+        return cls._format_label(
+            node.pk,
+            node.ctime,
+            node.base.extras.get("formula", None),
+            node.node_type,
+            node.label,
+            node.description,
+        )
 
     def _query_type_names(self):
         return ", ".join(
@@ -732,6 +1347,12 @@ class StructureBrowserWidget(ipw.VBox):
         self.results.options = [("Select a Structure", False)]
         self.results.value = False
         self.structure = None
+        self._disable_pagination()
+
+    def _disable_pagination(self):
+        self.page_info.value = ""
+        self.btn_previous_page.disabled = True
+        self.btn_next_page.disabled = True
 
     def _on_load_button_clicked(self, _=None):
         """When load button is clicked."""
@@ -755,8 +1376,9 @@ class StructureBrowserWidget(ipw.VBox):
             self.info.value = f"No AiiDA node found for PK={pk_value}."
         else:
             if isinstance(node, self.query_structure_type):
-                self.results.options = [(self._format_node_label(node), node)]
-                self.results.value = node
+                self._disable_pagination()
+                self.results.options = [(self._format_node_label(node), node.pk)]
+                self.results.value = node.pk
                 self.structure = node
             else:
                 self._clear_structure_selection()
@@ -765,16 +1387,265 @@ class StructureBrowserWidget(ipw.VBox):
                 )
 
 
+# Random seeds used to embed the molecules, the second one for the more robust retry.
+RDKIT_EMBEDDING_SEEDS = (42, 422)
+
+
+def _rdkit_check_optimization_status(status: int, ff: str, steps: int):
+    """Return a warning for a failed force field optimization, if any."""
+    if status == 0:
+        return None
+    elif status == 1:
+        return (
+            f"RDKit WARNING: {ff} optimization did not converge "
+            f"after {steps} iterations"
+        )
+    elif status == -1:
+        return f"RDKit WARNING: {ff} force field could not be set up"
+    else:
+        msg = f"RDKit {ff} optimizer returned unexpected status {status}"
+        raise ValueError(msg)
+
+
+def _rdkit_optimize(mol, ff, steps, num_conformers):
+    """Optimize all the conformers of the molecule with the given force field.
+
+    returns: the optimization status and the id of the lowest-energy conformer
+    """
+    from rdkit.Chem import AllChem
+
+    if num_conformers == 1:
+        optimize = (
+            AllChem.MMFFOptimizeMolecule
+            if ff == "MMFF94"
+            else AllChem.UFFOptimizeMolecule
+        )
+        return optimize(mol, maxIters=steps), -1
+
+    optimize = (
+        AllChem.MMFFOptimizeMoleculeConfs
+        if ff == "MMFF94"
+        else AllChem.UFFOptimizeMoleculeConfs
+    )
+    # `numThreads=0` uses all the available cores.
+    results = optimize(mol, numThreads=0, maxIters=steps)
+    conformers = [
+        (energy, status, conformer.GetId())
+        for (status, energy), conformer in zip(results, mol.GetConformers())
+        if status != -1
+    ]
+    if not conformers:
+        return -1, -1
+    _, status, conf_id = min(conformers)
+    return status, conf_id
+
+
+def rdkit_conformer(smiles, steps, num_conformers=1):
+    """Generate a 3D structure of a molecule and optimize it with a force field.
+
+    If more than one conformer is requested, all of them are optimized in parallel
+    and the one with the lowest energy is returned.
+    This runs in a worker process, so it only returns plain data:
+    the chemical species, the positions, and the list of warnings.
+
+    :raises ValueError: if the SMILES is invalid or the conformer generation fails
+    """
+    from rdkit import Chem
+    from rdkit.Chem import AllChem
+
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        # Something is seriously wrong with the SMILES code,
+        # just return None and don't attempt anything else.
+        msg = "Invalid SMILES"
+        raise ValueError(msg)
+    mol = Chem.AddHs(mol)
+
+    def embed(**kwargs):
+        if num_conformers == 1:
+            return AllChem.EmbedMolecule(mol, maxAttempts=20, **kwargs) >= 0
+        conf_ids = AllChem.EmbedMultipleConfs(
+            mol, numConfs=num_conformers, maxAttempts=20, numThreads=0, **kwargs
+        )
+        return len(conf_ids) > 0
+
+    seed, retry_seed = RDKIT_EMBEDDING_SEEDS
+    # If embedding fails, retry with different generation method that is supposed
+    # to be more stable. Perhaps we should switch to it by default.
+    # https://greglandrum.github.io/rdkit-blog/posts/2021-01-31-looking-at-random-coordinate-embedding.html#look-at-some-of-the-troublesome-structures
+    # https://www.rdkit.org/docs/source/rdkit.Chem.rdDistGeom.html#rdkit.Chem.rdDistGeom.EmbedMolecule
+    if not embed(randomSeed=seed) and not embed(
+        useRandomCoords=True, randomSeed=retry_seed
+    ):
+        msg = "RDKit could not generate conformer"
+        raise ValueError(msg)
+
+    warnings = []
+    mmff_status, conf_id = None, -1
+    if AllChem.MMFFHasAllMoleculeParams(mol):
+        mmff_status, conf_id = _rdkit_optimize(mol, "MMFF94", steps, num_conformers)
+        warnings.append(_rdkit_check_optimization_status(mmff_status, "MMFF94", steps))
+
+    if mmff_status == -1 or mmff_status is None:
+        if AllChem.UFFHasAllMoleculeParams(mol):
+            uff_status, conf_id = _rdkit_optimize(mol, "UFF", steps, num_conformers)
+            warnings.append(_rdkit_check_optimization_status(uff_status, "UFF", steps))
+        else:
+            warnings.append("RDKit WARNING: Missing MMFF94/UFF parameters")
+
+    positions = mol.GetConformer(conf_id).GetPositions()
+    species = [atom.GetSymbol() for atom in mol.GetAtoms()]
+    return species, positions, [warning for warning in warnings if warning]
+
+
+def _batch_rdkit_conformer(task):
+    """Generate a conformer in a batch and return the error instead of raising it."""
+    canonical_smiles = task[0]
+    try:
+        return canonical_smiles, rdkit_conformer(*task), None
+    # RDKit can raise just about anything for exotic molecules, a single
+    # failure should not abort the whole batch.
+    except Exception as error:  # noqa: BLE001
+        return canonical_smiles, None, str(error) or type(error).__name__
+
+
+class ConformerCache:
+    """Persistent on-disk cache of the conformers generated by `rdkit_conformer`.
+
+    Each conformer is stored in its own `.npz` file, so the cache directory
+    can be shared between several users. When the total size of the cache
+    exceeds `max_size` bytes, the least recently used conformers are evicted.
+
+    The directory is only scanned when the size of the cache, counted since the
+    last scan, exceeds `max_size`, so the conformers written by other users in
+    the meantime are only taken into account at the next scan.
+    """
+
+    # Fraction of `max_size` that is kept when evicting conformers, so that
+    # the directory is not scanned again for each of the following conformers.
+    EVICTION_TARGET = 0.8
+
+    def __init__(self, directory=None, max_size=100 * 1024**2):
+        if directory is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+            directory = pathlib.Path(cache_home).expanduser() / "aiidalab" / "smiles"
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+        self._size = None
+
+    @staticmethod
+    def key(canonical_smiles, steps, num_conformers=1):
+        """Return the cache key of a conformer generated with the given settings."""
+        settings = (canonical_smiles, RDKIT_EMBEDDING_SEEDS, steps, num_conformers)
+        return hashlib.sha256(repr(settings).encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached conformer or None if it is not in the cache."""
+        path = self.directory / f"{key}.npz"
+        try:
+            with np.load(path) as data:
+                conformer = (
+                    data["species"].tolist(),
+                    data["positions"],
+                    data["warnings"].tolist(),
+                )
+            # Mark the conformer as recently used.
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return conformer
+
+    def put(self, key, conformer):
+        """Store the conformer in the cache and evict the old ones if needed."""
+        species, positions, warnings = conformer
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write into a temporary file first, so that other users of
+            # the cache never read a partially written conformer.
+            with tempfile.NamedTemporaryFile(
+                dir=self.directory, suffix=".tmp", delete=False
+            ) as handle:
+                np.savez(
+                    handle,
+                    species=np.array(species, dtype=str),
+                    positions=np.asarray(positions),
+                    warnings=np.array(warnings, dtype=str),
+                )
+            os.chmod(handle.name, 0o644)
+            size = os.path.getsize(handle.name)
+            os.replace(handle.name, self.directory / f"{key}.npz")
+        except OSError:
+            # The cache is only an optimization, failing to write it is fine.
+            return
+        if self._size is None:
+            self._evict()
+        else:
+            self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Scan the cache directory and evict the least recently used conformers."""
+        entries = []
+        for path in self.directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        if total_size > self.max_size:
+            for _, size, path in sorted(entries):
+                if total_size <= self.EVICTION_TARGET * self.max_size:
+                    break
+                path.unlink(missing_ok=True)
+                total_size -= size
+        self._size = total_size
+
+
 class SmilesWidget(ipw.VBox):
-    """Convert SMILES into 3D structure."""
+    """Convert SMILES into 3D structure.
+
+    The conformers are generated by RDKit in a worker process so that the kernel
+    stays responsive. The generation can be cancelled by the user and it is
+    aborted after `timeout` seconds.
+
+    The generated conformers are stored in a `ConformerCache`, use `cache_dir`
+    to share the cache between users. Set `use_cache=False` to disable it.
+
+    Lists of SMILES can be converted at once with `import_batch`, which
+    runs the conformer generation in a pool of worker processes.
+    """
 
     structure = tl.Instance(ase.Atoms, allow_none=True)
 
     SPINNER = """<i class="fa fa-spinner fa-pulse" style="color:red;" ></i>"""
 
-    def __init__(self, title="", add_auxiliary_cell=True):
+    def __init__(
+        self,
+        title="",
+        add_auxiliary_cell=True,
+        timeout=120,
+        use_cache=True,
+        cache_dir=None,
+        cache_size=100 * 1024**2,
+    ):
         self.title = title
         self.add_auxiliary_cell = add_auxiliary_cell
+        self.timeout = timeout
+        self.cache = ConformerCache(cache_dir, cache_size) if use_cache else None
+        self._pool = None
+        self._job = None
+        self._job_lock = threading.Lock()
+        self._job_done = threading.Event()
+        self._job_done.set()
+        self._batch_thread = None
+        self._batch_start = 0.0
+        self._batch_cancelled = threading.Event()
+        self.batch_results = []
+        self.batch_errors = {}
+        self.batch_stats: dict[str, float] = {}
         try:
             from rdkit import Chem  # noqa: F401
             from rdkit.Chem import AllChem  # noqa: F401
@@ -796,10 +1667,85 @@ class SmilesWidget(ipw.VBox):
             tooltip="Generate molecule from SMILES string",
         )
         self.create_structure_btn.on_click(self._on_button_pressed)
+        self.cancel_btn = ipw.Button(
+            description="Cancel",
+            button_style="danger",
+            tooltip="Stop the conformer generation",
+            layout={"display": "none"},
+        )
+        self.cancel_btn.on_click(self.cancel)
+        self.num_conformers = ipw.BoundedIntText(
+            value=1,
+            min=1,
+            max=1000,
+            description="Conformers:",
+            description_allow_html=False,
+            tooltip="Number of conformers to optimize, the lowest-energy one is kept",
+            layout={"width": "160px"},
+        )
         self.output = ipw.HTML("")
 
+        # Batch import.
+        self.batch_smiles = ipw.Textarea(
+            placeholder="One SMILES per line",
+            layout={"width": "100%", "height": "120px"},
+        )
+        self.batch_file = ipw.FileUpload(
+            description="Upload SMILES file",
+            accept=".smi,.smiles,.txt",
+            multiple=False,
+            layout={"width": "initial"},
+        )
+        self.batch_file.observe(self._on_batch_file_upload, names="value")
+        self.batch_group = ipw.Text(
+            placeholder="Group label (optional)",
+            description="Store in group:",
+            style={"description_width": "initial"},
+        )
+        self.batch_btn = ipw.Button(
+            description="Import batch",
+            button_style="primary",
+            tooltip="Generate molecules from all the SMILES strings",
+        )
+        self.batch_btn.on_click(self._on_batch_button_pressed)
+        self.batch_cancel_btn = ipw.Button(
+            description="Cancel",
+            button_style="danger",
+            tooltip="Stop the batch import",
+            layout={"display": "none"},
+        )
+        self.batch_cancel_btn.on_click(self.cancel_batch)
+        self.batch_output = ipw.HTML("")
+        batch_panel = ipw.Accordion(
+            children=[
+                ipw.VBox(
+                    [
+                        self.batch_smiles,
+                        self.batch_file,
+                        ipw.HBox(
+                            [self.batch_group, self.batch_btn, self.batch_cancel_btn]
+                        ),
+                        self.batch_output,
+                    ]
+                )
+            ],
+            titles=["Batch import"],
+            selected_index=None,
+        )
+
         super().__init__(
-            [ipw.HBox([self.smiles, self.create_structure_btn]), self.output]
+            [
+                ipw.HBox(
+                    [
+                        self.smiles,
+                        self.num_conformers,
+                        self.create_structure_btn,
+                        self.cancel_btn,
+                    ]
+                ),
+                self.output,
+                batch_panel,
+            ]
         )
 
     def _make_ase(self, species, positions, smiles):
@@ -810,69 +1756,21 @@ class SmilesWidget(ipw.VBox):
         atoms.info["smiles"] = smiles
         return atoms
 
-    def _rdkit_opt(self, smiles, steps):
-        """Optimize a molecule using force field and rdkit (needed for complex SMILES)."""
-        from rdkit import Chem
-        from rdkit.Chem import AllChem
-
-        mol = Chem.MolFromSmiles(smiles)
-        if mol is None:
-            # Something is seriously wrong with the SMILES code,
-            # just return None and don't attempt anything else.
-            msg = "Invalid SMILES"
-            raise ValueError(msg)
-        mol = Chem.AddHs(mol)
-
-        conf_id = AllChem.EmbedMolecule(mol, maxAttempts=20, randomSeed=42)
-        if conf_id < 0:
-            # Retry with different generation method that is supposed to be
-            # more stable. Perhaps we should switch to it by default.
-            # https://greglandrum.github.io/rdkit-blog/posts/2021-01-31-looking-at-random-coordinate-embedding.html#look-at-some-of-the-troublesome-structures
-            # https://www.rdkit.org/docs/source/rdkit.Chem.rdDistGeom.html#rdkit.Chem.rdDistGeom.EmbedMolecule
-            conf_id = AllChem.EmbedMolecule(
-                mol, maxAttempts=20, useRandomCoords=True, randomSeed=422
-            )
-        if conf_id < 0:
-            msg = "RDKit could not generate conformer"
-            raise ValueError(msg)
-
-        def _check_optimization_status(status: int, ff: str) -> None:
-            if status == 0:
-                return
-            elif status == 1:
-                self.output.value = (
-                    f"RDKit WARNING: {ff} optimization did not converge "
-                    f"after {steps} iterations"
-                )
-            elif status == -1:
-                self.output.value = (
-                    f"RDKit WARNING: {ff} force field could not be set up"
-                )
-            else:
-                msg = f"RDKit {ff} optimizer returned unexpected status {status}"
-                raise ValueError(msg)
-
-        mmff_status = None
-        if AllChem.MMFFHasAllMoleculeParams(mol):
-            mmff_status = AllChem.MMFFOptimizeMolecule(mol, maxIters=steps)
-            _check_optimization_status(mmff_status, "MMFF94")
-
-        if mmff_status == -1 or mmff_status is None:
-            if AllChem.UFFHasAllMoleculeParams(mol):
-                uff_status = AllChem.UFFOptimizeMolecule(mol, maxIters=steps)
-                _check_optimization_status(uff_status, "UFF")
-            else:
-                self.output.value = "RDKit WARNING: Missing MMFF94/UFF parameters"
-
-        positions = mol.GetConformer().GetPositions()
-        natoms = mol.GetNumAtoms()
-        species = [mol.GetAtomWithIdx(j).GetSymbol() for j in range(natoms)]
+    def _conformer_to_ase(self, species, positions, smiles):
+        """Create ase Atoms object with the auxiliary cell, if requested."""
         ase_mol = self._make_ase(species, positions, smiles)
         if self.add_auxiliary_cell:
             ase_mol.cell = np.ptp(ase_mol.positions, axis=0) + 10
             ase_mol.center()
         return ase_mol
 
+    def _rdkit_opt(self, smiles, steps, num_conformers=1):
+        """Optimize a molecule using force field and rdkit (needed for complex SMILES)."""
+        species, positions, warnings = rdkit_conformer(smiles, steps, num_conformers)
+        if warnings:
+            self.output.value = warnings[-1]
+        return self._conformer_to_ase(species, positions, smiles)
+
     def _mol_from_smiles(self, smiles, steps=1000):
         """Convert SMILES to ASE structure using RDKit"""
         try:
@@ -882,26 +1780,334 @@ class SmilesWidget(ipw.VBox):
             self.output.value = str(e)
             return None
         else:
-            if canonical_smiles != smiles:
-                message = f"Canonical SMILES: {canonical_smiles}"
-                if self.output.value.startswith("RDKit WARNING"):
-                    message += f"<br>{self.output.value}"
-                self.output.value = message
+            self._show_canonical_smiles(smiles, canonical_smiles)
             return ase
 
-    def _on_button_pressed(self, change=None):
-        """Convert SMILES to ASE structure when button is pressed."""
+    def _show_canonical_smiles(self, smiles, canonical_smiles):
+        if canonical_smiles != smiles:
+            message = f"Canonical SMILES: {canonical_smiles}"
+            if self.output.value.startswith("RDKit WARNING"):
+                message += f"<br>{self.output.value}"
+            self.output.value = message
+
+    def _on_button_pressed(self, change=None, steps=1000):
+        """Convert SMILES to ASE structure in the worker process on button press."""
+        self.cancel()
         self.output.value = ""
 
         if not self.smiles.value:
             return
-        spinner = f"Screening possible conformers {self.SPINNER}"  # font-size:20em;
-        self.output.value = spinner
+        smiles = self.smiles.value
+        try:
+            canonical_smiles = self.canonicalize_smiles(smiles)
+        except ValueError as e:
+            self.output.value = str(e)
+            self.structure = None
+            return
+
+        num_conformers = self.num_conformers.value
+        cache_key = ConformerCache.key(canonical_smiles, steps, num_conformers)
+        if self.cache is not None and (conformer := self.cache.get(cache_key)):
+            self._show_conformer(conformer, smiles, canonical_smiles)
+            return
+
+        self.output.value = f"Screening possible conformers {self.SPINNER}"
+        # Show the result from the event loop of the kernel, like the other widget
+        # callbacks, rather than from the thread that handles the pool results.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        self._start_job(
+            smiles, canonical_smiles, steps, num_conformers, cache_key, loop
+        )
+
+    def _show_conformer(self, conformer, smiles, canonical_smiles):
+        species, positions, warnings = conformer
+        self.output.value = warnings[-1] if warnings else ""
+        self.structure = self._conformer_to_ase(species, positions, canonical_smiles)
+        self._show_canonical_smiles(smiles, canonical_smiles)
+
+    def _start_job(
+        self, smiles, canonical_smiles, steps, num_conformers, cache_key, loop=None
+    ):
+        """Run the conformer generation in the worker process.
+
+        The result is shown from the thread of `loop`, if given.
+        """
+        if self._pool is None:
+            # Forking the kernel, which runs several threads, is not safe.
+            self._pool = multiprocessing.get_context("spawn").Pool(processes=1)
+            weakref.finalize(self, self._pool.terminate)
+
+        job = object()
+
+        def finish(show_result):
+            if loop is None:
+                self._finish_job(job, show_result)
+            else:
+                loop.call_soon_threadsafe(self._finish_job, job, show_result)
+
+        def on_success(result):
+            def show_result():
+                self._show_conformer(result, smiles, canonical_smiles)
+                if self.cache is not None:
+                    self.cache.put(cache_key, result)
+
+            finish(show_result)
+
+        def on_error(error):
+            def show_error():
+                self.output.value = str(error)
+                self.structure = None
 
-        self.structure = self._mol_from_smiles(self.smiles.value)
-        # Don't overwrite possible error/warning messages
-        if self.output.value == spinner:
-            self.output.value = ""
+            finish(show_error)
+
+        def on_timeout():
+            def show_timeout():
+                self._terminate_pool()
+                self.output.value = (
+                    f"RDKit could not generate conformer in {self.timeout} seconds"
+                )
+                self.structure = None
+
+            finish(show_timeout)
+
+        with self._job_lock:
+            self._job = job
+            self._job_done.clear()
+            self._job_timer = threading.Timer(self.timeout, on_timeout)
+        self.cancel_btn.layout.display = None
+        self.create_structure_btn.disabled = True
+        self._pool.apply_async(
+            rdkit_conformer,
+            (canonical_smiles, steps, num_conformers),
+            callback=on_success,
+            error_callback=on_error,
+        )
+        self._job_timer.start()
+
+    def _finish_job(self, job, show_result):
+        """Show the result of the job, unless it was finished already.
+
+        The job is only marked as done once the widget has been updated,
+        so that `join()` returns with the result shown.
+        """
+        with self._job_lock:
+            if self._job is not job:
+                return
+            self._job = None
+            self._job_timer.cancel()
+        try:
+            show_result()
+        finally:
+            self.cancel_btn.layout.display = "none"
+            self.create_structure_btn.disabled = False
+            self._job_done.set()
+
+    def _terminate_pool(self):
+        # Terminating the pool is the only way to stop RDKit,
+        # a new worker process is started for the next molecule.
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def cancel(self, _=None):
+        """Cancel the running conformer generation, if any."""
+
+        def show_cancelled():
+            self._terminate_pool()
+            self.output.value = "Conformer generation was cancelled"
+
+        if self._job is not None:
+            self._finish_job(self._job, show_cancelled)
+
+    def join(self, timeout=None):
+        """Wait for the running conformer generation and batch import to finish.
+
+        When an event loop is running, the generated conformer is shown from its
+        thread, so this must not be called from that thread.
+        """
+        self._job_done.wait(timeout)
+        if self._batch_thread is not None:
+            self._batch_thread.join(timeout)
+
+    @staticmethod
+    def parse_smiles_list(text):
+        """Return the SMILES from a text with one molecule per line.
+
+        As in the .smi files, only the first column is used, the rest
+        of the line (typically the molecule name) is ignored, as are empty
+        lines and lines starting with '#'.
+        """
+        return [
+            line.split()[0]
+            for line in text.splitlines()
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+    def _on_batch_file_upload(self, change):
+        if not change["new"]:
+            return
+        file = change["new"][0]
+        self.batch_smiles.value = bytes(file["content"]).decode(errors="replace")
+
+    def _on_batch_button_pressed(self, _=None):
+        smiles_list = self.parse_smiles_list(self.batch_smiles.value)
+        if not smiles_list:
+            self.batch_output.value = "No SMILES to import"
+            return
+        self.import_batch(smiles_list, group_label=self.batch_group.value.strip())
+
+    def import_batch(self, smiles_list, steps=1000, group_label=None, processes=None):
+        """Generate molecules from a list of SMILES in a background thread.
+
+        The SMILES are canonicalized and deduplicated first, then the conformers
+        are generated in a pool of `processes` worker processes (all cores by
+        default). The results are appended to `batch_results` as they arrive:
+        `ase.Atoms` objects or, if `group_label` is given, stored `StructureData`
+        nodes added to that group. Failed SMILES are reported in `batch_errors`
+        and the counts and throughput in `batch_stats`.
+        Use `join()` to wait for the import to finish.
+        """
+        if self._batch_thread is not None and self._batch_thread.is_alive():
+            msg = "A batch import is already running"
+            raise RuntimeError(msg)
+        self.batch_results = []
+        self.batch_errors = {}
+        self.batch_stats = {}
+        self._batch_cancelled.clear()
+        self.batch_btn.disabled = True
+        self.batch_cancel_btn.layout.display = None
+        self._batch_thread = threading.Thread(
+            target=self._run_batch,
+            args=(list(smiles_list), steps, group_label, processes),
+            daemon=True,
+        )
+        self._batch_thread.start()
+
+    def cancel_batch(self, _=None):
+        """Stop the running batch import, the finished molecules are kept."""
+        self._batch_cancelled.set()
+
+    def _run_batch(self, smiles_list, steps, group_label, processes):
+        self._batch_start = time.perf_counter()
+        try:
+            self._generate_batch(smiles_list, steps, group_label, processes)
+        # Reported in the widget since there is nobody to catch it in this thread.
+        except Exception as error:  # noqa: BLE001
+            self.batch_output.value = f"Batch import failed: {error}"
+        else:
+            self._update_batch_stats(finished=True)
+        finally:
+            self.batch_btn.disabled = False
+            self.batch_cancel_btn.layout.display = "none"
+
+    def _generate_batch(self, smiles_list, steps, group_label, processes):
+        # Deduplicate on the canonical SMILES, keeping the first occurrence.
+        unique = {}
+        for smiles in smiles_list:
+            try:
+                unique.setdefault(self.canonicalize_smiles(smiles), smiles)
+            except ValueError as error:
+                self.batch_errors[smiles] = str(error)
+        self.batch_stats = {
+            "submitted": len(smiles_list),
+            "unique": len(unique),
+            "duplicates": len(smiles_list) - len(unique) - len(self.batch_errors),
+        }
+
+        try:
+            self._generate_conformers(unique, steps, processes, bool(group_label))
+        finally:
+            # Add the nodes in a single query rather than one by one.
+            if group_label and self.batch_results:
+                group, _ = orm.Group.collection.get_or_create(label=group_label)
+                group.add_nodes(self.batch_results)
+
+    def _generate_conformers(self, unique, steps, processes, store):
+        tasks = []
+        for canonical_smiles in unique:
+            cache_key = ConformerCache.key(canonical_smiles, steps)
+            if self.cache is not None and (conformer := self.cache.get(cache_key)):
+                self._add_batch_result(canonical_smiles, conformer, store)
+            else:
+                tasks.append((canonical_smiles, steps, 1))
+        self._update_batch_stats()
+        if not tasks:
+            return
+
+        processes = processes or os.cpu_count() or 1
+        # Send the tasks in chunks to save on the communication with
+        # the workers, but keep them small enough to balance the load.
+        chunksize = max(1, min(16, len(tasks) // (4 * processes)))
+        pending = {task[0] for task in tasks}
+        # Forking the kernel, which runs several threads, is not safe.
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            results = pool.imap_unordered(_batch_rdkit_conformer, tasks, chunksize)
+            while pending and not self._batch_cancelled.is_set():
+                # The results of a chunk arrive together, hence the timeout per
+                # chunk. If nothing arrives in time, a worker is most likely stuck,
+                # the remaining molecules are given up and the pool is terminated.
+                try:
+                    canonical_smiles, conformer, error = results.next(
+                        timeout=self.timeout * chunksize
+                    )
+                except multiprocessing.TimeoutError:
+                    for canonical_smiles in pending:
+                        self.batch_errors[unique[canonical_smiles]] = (
+                            "RDKit could not generate conformer "
+                            f"in {self.timeout} seconds"
+                        )
+                    break
+                pending.discard(canonical_smiles)
+                if error is not None:
+                    self.batch_errors[unique[canonical_smiles]] = error
+                else:
+                    if self.cache is not None:
+                        cache_key = ConformerCache.key(canonical_smiles, steps)
+                        self.cache.put(cache_key, conformer)
+                    self._add_batch_result(canonical_smiles, conformer, store)
+                self._update_batch_stats()
+
+    def _add_batch_result(self, canonical_smiles, conformer, store):
+        species, positions, _ = conformer
+        atoms = self._conformer_to_ase(species, positions, canonical_smiles)
+        if store:
+            node = StructureData(ase=atoms)
+            node.base.extras.set("smiles", canonical_smiles)
+            self.batch_results.append(node.store())
+        else:
+            self.batch_results.append(atoms)
+
+    def _update_batch_stats(self, finished=False):
+        elapsed = time.perf_counter() - self._batch_start
+        stats = self.batch_stats
+        stats.update(
+            {
+                "generated": len(self.batch_results),
+                "failed": len(self.batch_errors),
+                "elapsed": elapsed,
+                "throughput": len(self.batch_results) / elapsed if elapsed else 0.0,
+            }
+        )
+        if finished:
+            status = "cancelled" if self._batch_cancelled.is_set() else "finished"
+        else:
+            status = f"running {self.SPINNER}"
+        message = (
+            f"Batch import {status}: {stats['generated']} of {stats['unique']} "
+            f"molecules generated, {stats['failed']} failed, "
+            f"{stats['duplicates']} duplicates skipped "
+            f"({stats['throughput']:.1f} molecules/s)"
+        )
+        if self.batch_errors:
+            errors = "".join(
+                f"<li>{html.escape(smiles)}: {html.escape(error)}</li>"
+                for smiles, error in list(self.batch_errors.items())[:20]
+            )
+            message += f"<ul>{errors}</ul>"
+        self.batch_output.value = message
 
     # https://en.wikipedia.org/wiki/Simplified_molecular-input_line-entry_system#Terminology
     @staticmethod
@@ -936,7 +2142,8 @@ def _register_structure(operator):
     Checks whether a structure and selection is set and ensures that the
     arguments for structure and selection are passed by copy rather than
     reference. A pop-up warning message is shown in case that neither a
-    structure or selection are set.
+    structure or selection are set. Within an edit transaction, all the
+    operations share a single working copy of the structure.
     """
 
     @functools.wraps(operator)
@@ -948,16 +2155,93 @@ def _register_structure(operator):
             </div>
             """
         else:
+            input_selection = getattr(ref, "input_selection", None)
             operator(
                 ref,
                 *args,
                 **kwargs,
-                atoms=ref.structure.copy(),
+                atoms=ref._structure_to_modify(),
             )
+            if ref._in_transaction:
+                ref._follow_input_selection(input_selection)
 
     return inner
 
 
+class _StructureEditTransactionMixin(tl.HasTraits):
+    """Batch structure modifications of an editor into a single `structure` change.
+
+    This is a mixin class for the editors with a `structure` trait
+    whose operations are decorated with `_register_structure`.
+    """
+
+    _in_transaction = False
+    _working_copy = None
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Apply all the operations within the context to one copy of the structure.
+
+        The observers (e.g. the viewer) are notified about the modified structure
+        only once, when the context exits. As outside of a transaction, the
+        selection follows the atoms selected by each operation, e.g. the atoms
+        just added. If an exception is raised, the original structure and
+        selection are restored.
+
+        with editor.transaction():
+            editor.selection = [0, 1]
+            editor.translate_dr()
+            editor.rotate()
+        """
+        if self._in_transaction:
+            # A nested transaction is part of the outer one.
+            yield self
+            return
+
+        original = {
+            name: getattr(self, name)
+            for name in ("structure", "input_selection", "selection")
+            if self.has_trait(name)
+        }
+        self._in_transaction = True
+        try:
+            with self.hold_trait_notifications():
+                try:
+                    yield self
+                except BaseException:
+                    for name, value in original.items():
+                        setattr(self, name, value)
+                    raise
+        finally:
+            self._in_transaction = False
+            self._working_copy = None
+
+    def _follow_input_selection(self, previous):
+        """Update the selection if an operation within a transaction set a new one.
+
+        Outside of a transaction, the viewer turns the `input_selection` into the
+        `selection`, but its notifications are held until the transaction ends.
+        """
+        if not (self.has_trait("input_selection") and self.has_trait("selection")):
+            return
+        if self.input_selection is None or self.input_selection is previous:
+            return
+        natoms = len(self.structure)
+        self.selection = [
+            index for index in dict.fromkeys(self.input_selection) if index < natoms
+        ]
+
+    def _structure_to_modify(self):
+        """Return a copy of the structure that can be modified in place."""
+        if not self._in_transaction:
+            return self.structure.copy()
+        # Only copy the structure when the transaction starts, or if the structure
+        # was replaced by a new object during the transaction.
+        if self.structure is not self._working_copy:
+            self._working_copy = self.structure.copy()
+        return self._working_copy
+
+
 def _register_selection(operator):
     """
     Decorator for methods that manipulate (operate on) the selected structure.
@@ -987,7 +2271,20 @@ def _register_selection(operator):
     return inner
 
 
-class BasicCellEditor(ipw.VBox):
+def _stack_copies(atoms, translations):
+    """Return copies of the atoms translated by each of the translation vectors.
+
+    The copies are built from a single stacked positions array, so that adding
+    them to a structure reallocates its arrays only once.
+    """
+    copies = atoms[np.tile(np.arange(len(atoms)), len(translations))]
+    copies.positions = (
+        atoms.positions[np.newaxis, :, :] + translations[:, np.newaxis, :]
+    ).reshape(-1, 3)
+    return copies
+
+
+class BasicCellEditor(_StructureEditTransactionMixin, ipw.VBox):
     """Widget that allows for the basic cell editing."""
 
     structure = tl.Instance(ase.Atoms, allow_none=True)
@@ -1113,21 +2410,18 @@ class BasicCellEditor(ipw.VBox):
         structure: ase.Atoms, to_primitive=False, no_idealize=False, symprec=1e-5
     ):
         """The `standardize_cell` method from spglib and apply to ase.Atoms"""
-        import spglib
-
-        lattice = structure.get_cell()
-        positions = structure.get_scaled_positions()
-        numbers = structure.get_atomic_numbers()
-
-        cell = (lattice, positions, numbers)
-
-        old_error_handling = _set_spglib_old_error_handling()
-        standard_cell = spglib.standardize_cell(
-            cell, to_primitive=to_primitive, no_idealize=no_idealize, symprec=symprec
+        standard_cell = symmetry.standardize_cell(
+            structure,
+            to_primitive=to_primitive,
+            no_idealize=no_idealize,
+            symprec=symprec,
         )
-        _restore_spglib_old_error_handling(old_error_handling)
         if standard_cell is not None:
             lattice, positions, numbers = standard_cell
+        else:
+            lattice = structure.get_cell()
+            positions = structure.get_scaled_positions()
+            numbers = structure.get_atomic_numbers()
 
         return ase.Atoms(
             cell=lattice,
@@ -1200,7 +2494,7 @@ class BasicCellEditor(ipw.VBox):
             self.cell_transformation.children[i].children[i].value = 1
 
 
-class BasicStructureEditor(ipw.VBox):
+class BasicStructureEditor(_StructureEditTransactionMixin, ipw.VBox):
     """
     Widget that allows for the basic structure (molecule and
     position of periodic structure in cell) editing."""
@@ -1212,6 +2506,7 @@ class BasicStructureEditor(ipw.VBox):
 
     def __init__(self, title=""):
         self.title = title
+        self._neighbor_list = None
 
         # Define action vector.
         self.axis_p1 = ipw.Text(
@@ -1322,6 +2617,13 @@ class BasicStructureEditor(ipw.VBox):
             style={"description_width": "initial"},
         )
         tl.link((use_covalent_radius, "value"), (self.bond_length, "disabled"))
+        self.away_from_neighbors = ipw.Checkbox(
+            value=False,
+            description="Away from neighbors",
+            tooltip="Add the atoms opposite to the existing bonds "
+            "instead of along the action vector",
+            style={"description_width": "initial"},
+        )
 
         # Copy atoms.
         btn_copy_sel = ipw.Button(
@@ -1431,6 +2733,7 @@ class BasicStructureEditor(ipw.VBox):
                         btn_add,
                         self.bond_length,
                         use_covalent_radius,
+                        self.away_from_neighbors,
                     ],
                     layout={"margin": "0px 0px 0px 20px"},
                 ),
@@ -1623,27 +2926,23 @@ class BasicStructureEditor(ipw.VBox):
         last_atom = atoms.get_global_number_of_atoms()
 
         if self.ligand.value == 0:
-            for idx in self.selection:
-                new = ase.Atom(self.element.value)
-                atoms[idx].mass = new.mass
-                atoms[idx].magmom = new.magmom
-                atoms[idx].momentum = new.momentum
-                atoms[idx].symbol = new.symbol
-                atoms[idx].tag = new.tag
-                atoms[idx].charge = new.charge
+            number = ase.data.atomic_numbers[self.element.value]
+            atoms.numbers[selection] = number
+            # Without the masses array, ASE uses the default masses anyway.
+            if "masses" in atoms.arrays:
+                atoms.arrays["masses"][selection] = ase.data.atomic_masses[number]
+            # Reset the per-atom properties to the defaults of a new atom.
+            for name in ("initial_magmoms", "momenta", "tags", "initial_charges"):
+                if name in atoms.arrays:
+                    atoms.arrays[name][selection] = 0
             new_selection = selection
         else:
             initial_ligand = self.ligand.rotate(
                 align_to=self.action_vector, remove_anchor=True
             )
-
-            for idx in self.selection:
-                position = self.structure.positions[idx].copy()
-                lgnd = initial_ligand.copy()
-                lgnd.translate(position)
-                atoms += lgnd
+            atoms += _stack_copies(initial_ligand, atoms.positions[selection])
             new_selection = list(
-                range(last_atom, last_atom + len(selection) * len(lgnd))
+                range(last_atom, last_atom + len(selection) * len(initial_ligand))
             )
 
         self.structure, self.input_selection = atoms, new_selection
@@ -1677,28 +2976,72 @@ class BasicStructureEditor(ipw.VBox):
             initial_ligand = self.ligand.rotate(align_to=self.action_vector)
             rad = SYMBOL_RADIUS[self.ligand.anchoring_atom]
 
-        for idx in self.selection:
-            # It is important to copy, otherwise the initial structure will be modified
-            position = self.structure.positions[idx].copy()
-            lgnd = initial_ligand.copy()
-
-            if self.bond_length.disabled:
-                lgnd.translate(
-                    position
-                    + self.action_vector
-                    * (SYMBOL_RADIUS[self.structure.symbols[idx]] + rad)
-                )
-            else:
-                lgnd.translate(position + self.action_vector * self.bond_length.value)
+        if self.bond_length.disabled:
+            bond_lengths = ase.data.covalent_radii[atoms.numbers[selection]] + rad
+        else:
+            bond_lengths = np.full(len(selection), self.bond_length.value)
+        if self.away_from_neighbors.value:
+            directions = self._directions_away_from_neighbors(atoms, selection)
+        else:
+            directions = np.tile(self.action_vector, (len(selection), 1))
+        anchors = atoms.positions[selection] + bond_lengths[:, np.newaxis] * directions
 
-            atoms += lgnd
+        ligands = _stack_copies(initial_ligand, anchors)
+        if self.away_from_neighbors.value and self.ligand.value != 0:
+            # Each copy of the ligand points in its own direction.
+            ligands.positions = np.concatenate(
+                [
+                    self.ligand.rotate(align_to=direction).positions + anchor
+                    for direction, anchor in zip(directions, anchors)
+                ]
+            )
+        atoms += ligands
 
-        new_selection = list(range(last_atom, last_atom + len(selection) * len(lgnd)))
+        new_selection = list(
+            range(last_atom, last_atom + len(selection) * len(initial_ligand))
+        )
 
         # The order of the traitlets below is important -
         # we must be sure trait atoms is set before trait selection
         self.structure, self.input_selection = atoms, new_selection
 
+    @property
+    def neighbors(self):
+        """Bonded neighbors of the atoms in the current structure.
+
+        The neighbor list is cached and updated incrementally after local edits.
+        """
+        if self.structure is None:
+            return None
+        return self._neighbors_of(self.structure)
+
+    def _neighbors_of(self, atoms):
+        if self._neighbor_list is None:
+            self._neighbor_list = NeighborList(atoms)
+        else:
+            self._neighbor_list.update(atoms)
+        return self._neighbor_list
+
+    def _directions_away_from_neighbors(self, atoms, selection):
+        """Return the unit vectors pointing away from the bonds of the atoms.
+
+        The action vector is used for the atoms without neighbors, or if their
+        bonds cancel out (e.g. in a linear or a planar environment).
+        """
+        neighbors = self._neighbors_of(atoms)
+        directions = np.tile(self.action_vector, (len(selection), 1))
+        for row, index in enumerate(selection):
+            bonds = neighbors.bond_vectors(index)
+            if len(bonds) == 0:
+                continue
+            direction = -np.sum(
+                bonds / np.linalg.norm(bonds, axis=1)[:, np.newaxis], axis=0
+            )
+            norm = np.linalg.norm(direction)
+            if norm > 1e-3:
+                directions[row] = direction / norm
+        return directions
+
     @_register_structure
     @_register_selection
     def remove(self, _=None, atoms=None, selection=None):
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import hashlib
 import itertools
 import operator
 import threading
@@ -137,6 +138,52 @@ def get_formula(data_node):
         raise TypeError(f"Cannot get formula from node {type(data_node)}")
 
 
+def get_elements(data_node):
+    """Get the sorted list of chemical elements contained in the AiiDA Data node."""
+    if isinstance(data_node, TrajectoryData):
+        symbols = data_node.symbols
+    elif isinstance(data_node, StructureData):
+        symbols = data_node.get_symbols_set()
+    elif isinstance(data_node, CifData):
+        symbols = data_node.get_ase().get_chemical_symbols()
+    else:
+        raise TypeError(f"Cannot get elements from node {type(data_node)}")
+    return sorted(set(symbols))
+
+
+def get_structure_hash(structure, decimals=4):
+    """Get a hash identifying the geometry of a structure (ASE Atoms or AiiDA node).
+
+    The hash does not depend on the order of the atoms, on the orientation of
+    the cell, or on whether the atoms are wrapped into the cell. Positions
+    (fractional for periodic directions) and cell parameters are compared
+    after rounding to `decimals` digits.
+    """
+    if isinstance(structure, (StructureData, CifData)):
+        structure = structure.get_ase()
+    elif not isinstance(structure, ase.Atoms):
+        raise TypeError(f"Cannot get structure hash from {type(structure)}")
+
+    pbc = structure.pbc
+    if pbc.any():
+        positions = structure.get_scaled_positions(wrap=False)
+        positions[:, pbc] %= 1.0
+        positions = np.round(positions, decimals)
+        # Rounding can map positions close to 1.0 back to the cell boundary.
+        positions[:, pbc] %= 1.0
+    else:
+        positions = np.round(structure.positions, decimals)
+    cellpar = np.round(structure.cell.cellpar(), decimals - 1)
+
+    numbers = structure.numbers
+    order = np.lexsort((positions[:, 2], positions[:, 1], positions[:, 0], numbers))
+    structure_hash = hashlib.sha256()
+    # Adding zero turns negative zeros into positive ones, which hash differently.
+    for array in (numbers[order], positions[order] + 0.0, cellpar + 0.0, pbc):
+        structure_hash.update(np.ascontiguousarray(array).tobytes())
+    return structure_hash.hexdigest()
+
+
 class PinholeCamera:
     def __init__(self, matrix):
         self.matrix = np.reshape(matrix, (4, 4)).transpose()
@@ -0,0 +1,144 @@
+"""Neighbor lists of atomic structures, shared by the viewers and the editors."""
+
+from __future__ import annotations
+
+import ase
+import ase.geometry
+import ase.neighborlist
+import numpy as np
+
+# The value 1.09 is chosen based on our experience. It is a good compromise between
+# showing too many bonds and not showing bonds that should be there.
+BOND_CUTOFF_MULT = 1.09
+
+
+def bond_cutoffs(structure: ase.Atoms) -> list[float]:
+    """Return the per-atom cutoffs, two atoms are bonded if closer than their sum."""
+    return ase.neighborlist.natural_cutoffs(structure, mult=BOND_CUTOFF_MULT)
+
+
+class NeighborList:
+    """Bonded neighbors of the atoms in a structure, periodic images included.
+
+    The neighbors are defined with the same cutoffs as the bonds shown by the
+    structure viewer. After local edits, `update` only recomputes the neighbors
+    of the atoms that were modified or appended, which is much cheaper than
+    building the whole neighbor list again for large structures.
+    """
+
+    # Above this fraction of modified atoms, rebuilding the list is faster.
+    MAX_INCREMENTAL_FRACTION = 0.2
+
+    # Number of modified atoms whose distances are computed at once.
+    CHUNK_SIZE = 256
+
+    def __init__(self, structure: ase.Atoms):
+        self._neighbors: list[set[int]] = []
+        self._rebuild(structure)
+
+    def __len__(self):
+        return len(self._neighbors)
+
+    def __getitem__(self, index: int) -> list[int]:
+        """Return the sorted indices of the neighbors of the atom."""
+        return sorted(self._neighbors[index])
+
+    def coordination_numbers(self) -> np.ndarray:
+        """Return the number of neighbors of each atom."""
+        return np.array([len(neighbors) for neighbors in self._neighbors], dtype=int)
+
+    def bond_vectors(self, index: int) -> np.ndarray:
+        """Return the vectors from the atom to its (closest images of) neighbors."""
+        neighbors = self[index]
+        if not neighbors:
+            return np.zeros((0, 3))
+        vectors, _ = ase.geometry.get_distances(
+            self._positions[index],
+            self._positions[neighbors],
+            cell=self._cell,
+            pbc=self._pbc,
+        )
+        return vectors[0]
+
+    def update(self, structure: ase.Atoms, changed=None):
+        """Update the neighbors after the structure has been modified.
+
+        :param changed: indices of the modified atoms, they are found by comparing
+            with the previous structure if not given. Appended atoms are always
+            considered as modified.
+        """
+        if self._needs_rebuild(structure):
+            self._rebuild(structure)
+            return
+
+        old_count = len(self._neighbors)
+        if changed is None:
+            changed = np.flatnonzero(
+                (structure.numbers[:old_count] != self._numbers)
+                | np.any(structure.positions[:old_count] != self._positions, axis=1)
+            )
+        changed = np.union1d(
+            np.asarray(changed, dtype=int), np.arange(old_count, len(structure))
+        )
+        if len(changed) == 0:
+            return
+        if len(changed) > self.MAX_INCREMENTAL_FRACTION * len(structure):
+            self._rebuild(structure)
+            return
+
+        self._store_snapshot(structure)
+        self._neighbors.extend(set() for _ in range(old_count, len(structure)))
+        for index in changed:
+            for neighbor in self._neighbors[index]:
+                self._neighbors[neighbor].discard(index)
+            self._neighbors[index] = set()
+
+        for start in range(0, len(changed), self.CHUNK_SIZE):
+            chunk = changed[start : start + self.CHUNK_SIZE]
+            _, distances = ase.geometry.get_distances(
+                self._positions[chunk],
+                self._positions,
+                cell=self._cell,
+                pbc=self._pbc,
+            )
+            bonded = distances < self._cutoffs[chunk, np.newaxis] + self._cutoffs
+            bonded[np.arange(len(chunk)), chunk] = False
+            for index, row in zip(chunk, bonded):
+                for neighbor in np.flatnonzero(row):
+                    self._neighbors[index].add(int(neighbor))
+                    self._neighbors[neighbor].add(int(index))
+
+    def _needs_rebuild(self, structure):
+        """Check whether the list can be updated incrementally."""
+        if (
+            len(structure) < len(self._neighbors)
+            or not np.array_equal(structure.pbc, self._pbc)
+            or not np.allclose(structure.cell.array, self._cell)
+        ):
+            return True
+        # The closest images used by the incremental updates are only sufficient
+        # if no atom can bond to several images of the same atom.
+        # That is, if the cell heights are at least twice the longest bond.
+        if structure.pbc.any() and len(structure):
+            inverse_heights = np.linalg.norm(structure.cell.reciprocal(), axis=1)
+            max_bond = 2 * max(bond_cutoffs(structure))
+            return bool(np.any(inverse_heights[structure.pbc] * 2 * max_bond > 1))
+        return False
+
+    def _rebuild(self, structure):
+        self._store_snapshot(structure)
+        self._neighbors = [set() for _ in range(len(structure))]
+        if len(structure) <= 1:
+            return
+        first, second = ase.neighborlist.neighbor_list(
+            "ij", structure, list(self._cutoffs), self_interaction=False
+        )
+        for index, neighbor in zip(first.tolist(), second.tolist()):
+            self._neighbors[index].add(neighbor)
+
+    def _store_snapshot(self, structure):
+        self._numbers = structure.numbers.copy()
+        self._positions = structure.positions.copy()
+        self._cell = structure.cell.array.copy()
+        self._pbc = structure.pbc.copy()
+        self._cutoffs = np.array(bond_cutoffs(structure))
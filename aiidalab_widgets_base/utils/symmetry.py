@@ -0,0 +1,136 @@
+"""Cached spglib symmetry analysis, shared by the structure editors and viewers."""
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import threading
+
+import ase
+import numpy as np
+
+from . import (
+    _restore_spglib_old_error_handling,
+    _set_spglib_old_error_handling,
+    ase2spglib,
+)
+
+# Number of spglib results that are kept in the cache.
+CACHE_SIZE = 64
+
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def structure_fingerprint(structure: ase.Atoms) -> str:
+    """Return a hash of the cell, scaled positions and atomic numbers of the structure.
+
+    These are exactly the inputs of spglib, so two structures with the same
+    fingerprint have the same symmetry.
+    """
+    lattice, positions, numbers = ase2spglib(structure)
+    fingerprint = hashlib.blake2b(digest_size=16)
+    for array in (lattice, positions, numbers):
+        fingerprint.update(np.ascontiguousarray(array).tobytes())
+    return fingerprint.hexdigest()
+
+
+# Transformations from the standardized conventional cell to the primitive
+# cell for each centering, as used by `spglib.standardize_cell`.
+_CENTERINGS = {
+    "A": [[1, 0, 0], [0, 1 / 2, -1 / 2], [0, 1 / 2, 1 / 2]],
+    "C": [[1 / 2, 1 / 2, 0], [-1 / 2, 1 / 2, 0], [0, 0, 1]],
+    "I": [[-1 / 2, 1 / 2, 1 / 2], [1 / 2, -1 / 2, 1 / 2], [1 / 2, 1 / 2, -1 / 2]],
+    "F": [[0, 1 / 2, 1 / 2], [1 / 2, 0, 1 / 2], [1 / 2, 1 / 2, 0]],
+    "R": [[2 / 3, -1 / 3, -1 / 3], [1 / 3, 1 / 3, -2 / 3], [1 / 3, 1 / 3, 1 / 3]],
+}
+
+# Tolerances shared by the structure editors and viewers.
+SYMPREC = 1e-5
+ANGLE_TOLERANCE = -1.0
+
+
+def get_symmetry_dataset(
+    structure: ase.Atoms, symprec=SYMPREC, angle_tolerance=ANGLE_TOLERANCE
+):
+    """Return the spglib symmetry dataset of the structure, or None if it fails.
+
+    The dataset is cached, it must not be modified.
+    """
+    import spglib
+
+    return _cached(
+        (structure_fingerprint(structure), symprec, angle_tolerance),
+        lambda: spglib.get_symmetry_dataset(
+            ase2spglib(structure), symprec=symprec, angle_tolerance=angle_tolerance
+        ),
+    )
+
+
+def standardize_cell(
+    structure: ase.Atoms,
+    to_primitive=False,
+    no_idealize=False,
+    symprec=SYMPREC,
+    angle_tolerance=ANGLE_TOLERANCE,
+):
+    """Return the spglib standardized (lattice, scaled positions, numbers) or None.
+
+    The idealized cells are derived from the cached symmetry dataset, the same
+    way as `spglib.standardize_cell` does, so that converting and displaying
+    a structure runs spglib only once. The returned arrays must not be modified.
+    """
+    if no_idealize:
+        import spglib
+
+        old_error_handling = _set_spglib_old_error_handling()
+        try:
+            return spglib.standardize_cell(
+                ase2spglib(structure),
+                to_primitive=to_primitive,
+                no_idealize=True,
+                symprec=symprec,
+                angle_tolerance=angle_tolerance,
+            )
+        finally:
+            _restore_spglib_old_error_handling(old_error_handling)
+
+    dataset = get_symmetry_dataset(structure, symprec, angle_tolerance)
+    if dataset is None:
+        return None
+    lattice = dataset.std_lattice
+    positions = dataset.std_positions
+    numbers = dataset.std_types
+    if not to_primitive:
+        return lattice, positions, numbers
+
+    centering = np.array(_CENTERINGS.get(dataset.international[0], np.eye(3)))
+    _, atoms = np.unique(dataset.std_mapping_to_primitive, return_index=True)
+    positions = positions[atoms] @ np.linalg.inv(centering).T % 1.0
+    positions[np.isclose(positions, 1.0)] = 0.0
+    return centering.T @ lattice, positions, numbers[atoms]
+
+
+def clear_cache():
+    """Remove all the cached spglib results."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _cached(key, compute):
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    old_error_handling = _set_spglib_old_error_handling()
+    try:
+        result = compute()
+    finally:
+        _restore_spglib_old_error_handling(old_error_handling)
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
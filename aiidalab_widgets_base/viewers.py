@@ -3,12 +3,12 @@ from __future__ import annotations
 """Jupyter viewers for AiiDA data objects."""
 
 import base64
+import collections
 import copy
 import csv
 import io
 import os
 import pathlib
-import re
 import warnings
 from html import escape
 
@@ -20,7 +20,7 @@ import numpy as np
 import shortuuid
 import traitlets as tl
 import vapory
-from aiida import cmdline, orm
+from aiida import orm
 from aiida.orm.nodes.data.structure import _get_dimensionality
 from aiida.tools.query.formatting import format_process_state, format_relative_time
 from ase.data import colors
@@ -31,12 +31,11 @@ from .dicts import RGB_COLORS, Colors, Radius
 from .loaders import LoadingWidget
 from .misc import CopyToClipboardButton, ReversePolishNotation
 from .utils import (
-    _restore_spglib_old_error_handling,
-    _set_spglib_old_error_handling,
-    ase2spglib,
     list_to_string_range,
     string_range_to_list,
+    symmetry,
 )
+from .utils.neighbors import bond_cutoffs
 
 AIIDA_VIEWER_MAPPING = {}
 DICT_VIEWER_HEADERS = ("Key", "Value")
@@ -685,9 +684,7 @@ class _StructureDataBaseViewer(ipw.VBox):
         # The radius is scaled by 0.04 to have a better visual appearance.
         radius = radius * 0.04
 
-        # The value 1.09 is chosen based on our experience. It is a good compromise between showing too many bonds
-        # and not showing bonds that should be there.
-        cutoff = ase.neighborlist.natural_cutoffs(structure, mult=1.09)
+        cutoff = bond_cutoffs(structure)
 
         ii, bond_vectors = ase.neighborlist.neighbor_list(
             "iD", structure, cutoff, self_interaction=False
@@ -759,8 +756,6 @@ class _StructureDataBaseViewer(ipw.VBox):
 
     @tl.observe("cell")
     def _observe_cell(self, _=None):
-        import spglib
-
         # Updtate the Cell and Periodicity.
         if self.cell:
             self.cell_a.value = "<i><b>a</b></i>: {:.4f} {:.4f} {:.4f}".format(
@@ -787,13 +782,7 @@ class _StructureDataBaseViewer(ipw.VBox):
             self.cell_beta.value = f"&beta;: {self.cell.angles()[1]:.4f}"
             self.cell_gamma.value = f"&gamma;: {self.cell.angles()[2]:.4f}"
 
-            spglib_structure = ase2spglib(self.structure)
-
-            old_error_handling = _set_spglib_old_error_handling()
-            symmetry_dataset = spglib.get_symmetry_dataset(
-                spglib_structure, symprec=1e-5, angle_tolerance=1.0
-            )
-            _restore_spglib_old_error_handling(old_error_handling)
+            symmetry_dataset = symmetry.get_symmetry_dataset(self.structure)
 
             periodicity_map = {
                 (True, True, True): "xyz",
@@ -1779,18 +1768,55 @@ class FolderDataViewer(ipw.VBox):
 @register_viewer_widget("process.workflow.workfunction.WorkFunctionNode.")
 @register_viewer_widget("process.workflow.workchain.WorkChainNode.")
 class ProcessNodeViewerWidget(ipw.HTML):
-    def __init__(self, process, **kwargs):
+    """Header and report of a process.
+
+    The report is streamed: `update` only fetches the log entries added since
+    the previous update, so the widget can follow a running process, e.g. as a
+    follower of `ProcessFollowerWidget`. Only the last `max_lines` lines are kept
+    and shown in a scrollable box.
+    """
+
+    # Log levels included in the report, as in `verdi process report`.
+    REPORT_LEVELS = ("REPORT", "WARNING", "ERROR", "CRITICAL")
+
+    def __init__(self, process, title="Process report", max_lines=1000, **kwargs):
         self.process = process
+        self.title = title  # needed for ProcessFollowerWidget
+
+        self._report_lines = collections.deque(maxlen=max_lines)
+        self._num_report_lines = 0
+        self._last_log_id = -1
 
+        super().__init__(**kwargs)
+        self.update()
+
+    def _fetch_report_lines(self):
+        """Return the report lines logged since the last fetch."""
         # Displaying reports only from the selected process,
         # NOT from its descendants.
-        report = cmdline.utils.common.get_workchain_report(
-            self.process, "REPORT", max_depth=1
-        )
-        # Filter out the first column with dates
-        filtered_report = re.sub(
-            r"^[0-9]{4}.*\| ([A-Z]+)\]", r"\1", report, flags=re.MULTILINE
+        queryb = orm.QueryBuilder().append(
+            orm.Log,
+            filters={
+                "dbnode_id": self.process.pk,
+                "id": {">": self._last_log_id},
+                "levelname": {"in": self.REPORT_LEVELS},
+            },
+            project=["id", "levelname", "message"],
         )
+        queryb.order_by({orm.Log: {"id": "asc"}})
+        lines = []
+        for log_id, levelname, message in queryb.iterall():
+            self._last_log_id = log_id
+            lines.append(f"{levelname}: {escape(message)}")
+        return lines
+
+    def update(self):
+        """Append the new report lines and refresh the header."""
+        lines = self._fetch_report_lines()
+        self._report_lines.extend(lines)
+        self._num_report_lines += len(lines)
+
+        process = self.process
         header = f"""
             Process {process.process_label},
             State: {format_process_state(process.process_state.value)},
@@ -1798,6 +1824,10 @@ class ProcessNodeViewerWidget(ipw.HTML):
             Started {format_relative_time(process.ctime)},
             Last modified {format_relative_time(process.mtime)}<br>
         """
-        self.value = f"{header}<pre>{filtered_report}</pre>"
-
-        super().__init__(**kwargs)
+        num_hidden = self._num_report_lines - len(self._report_lines)
+        if num_hidden:
+            header += f"<i>{num_hidden} earlier report lines are not shown.</i><br>"
+        report = "\n".join(self._report_lines)
+        self.value = (
+            f'{header}<pre style="max-height: 40em; overflow-y: auto">{report}</pre>'
+        )
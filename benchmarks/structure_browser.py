@@ -0,0 +1,137 @@
+"""Benchmark the provenance modes of `StructureBrowserWidget`.
+
+The benchmark populates a profile with synthetic structures (a third of them
+uploaded, edited and calculated, respectively) and records how long a search
+takes in each mode, i.e. building the query, counting the matches and fetching
+the first page of results.
+
+WARNING: the synthetic nodes are added to the profile permanently,
+use a dedicated, throwaway profile:
+
+    verdi profile setup core.sqlite_dos --profile-name benchmark ...
+    python benchmarks/structure_browser.py --profile benchmark --structures 100000
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from aiida import load_profile, orm
+from aiida.common import LinkType, NotExistent
+from aiida.manage import get_manager
+
+MODES = ("all", "uploaded", "edited", "calculated")
+
+# Number of structures created by a single synthetic process.
+STRUCTURES_PER_PROCESS = 10
+
+
+def _structure(index):
+    structure = orm.StructureData(cell=[[4.0, 0, 0], [0, 4.0, 0], [0, 0, 4.0]])
+    structure.append_atom(position=(0, 0, 0), symbols="Si")
+    structure.append_atom(position=(1.0, 1.0, 0.1 * (index % 10)), symbols="O")
+    structure.base.extras.set("benchmark", True)
+    return structure
+
+
+def _process(kind, computer):
+    if kind == "edited":
+        process = orm.CalcFunctionNode()
+    else:
+        process = orm.CalcJobNode(computer=computer)
+    process.label = f"benchmark-{kind}"
+    return process.store()
+
+
+def _computer():
+    try:
+        return orm.load_computer("benchmark")
+    except NotExistent:
+        return orm.Computer(
+            label="benchmark",
+            hostname="localhost",
+            transport_type="core.local",
+            scheduler_type="core.direct",
+        ).store()
+
+
+def populate(count):
+    """Store synthetic structures until the profile contains `count` of them."""
+    existing = (
+        orm.QueryBuilder()
+        .append(orm.StructureData, filters={"extras.benchmark": True})
+        .count()
+    )
+    computer = _computer()
+    kinds = ("uploaded", "edited", "calculated")
+    processes = {}
+    with get_manager().get_profile_storage().transaction():
+        for index in range(existing, count):
+            kind = kinds[index % len(kinds)]
+            structure = _structure(index)
+            if kind != "uploaded":
+                if (index // len(kinds)) % STRUCTURES_PER_PROCESS == 0:
+                    processes.pop(kind, None)
+                if kind not in processes:
+                    processes[kind] = _process(kind, computer)
+                structure.base.links.add_incoming(
+                    processes[kind],
+                    link_type=LinkType.CREATE,
+                    link_label=f"structure_{index}",
+                )
+            structure.store()
+    return max(count - existing, 0)
+
+
+def benchmark(repeat):
+    """Time a search in each of the provenance modes."""
+    from aiidalab_widgets_base import StructureBrowserWidget
+
+    widget = StructureBrowserWidget()
+    widget.start_date_widget.value = "1970-01-01"
+    widget.end_date_widget.value = "2999-12-31"
+
+    timings = {}
+    for mode in MODES:
+        widget.mode.value = mode
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            widget.search()
+            samples.append(time.perf_counter() - start)
+        timings[mode] = {
+            "matches": widget._matches_count,
+            "min": min(samples),
+            "median": statistics.median(samples),
+        }
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", required=True, help="Throwaway AiiDA profile.")
+    parser.add_argument("--structures", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the timings into this JSON file.")
+    args = parser.parse_args()
+
+    load_profile(args.profile)
+    start = time.perf_counter()
+    created = populate(args.structures)
+    print(f"Created {created} structures in {time.perf_counter() - start:.1f} s")
+
+    timings = benchmark(args.repeat)
+    for mode, timing in timings.items():
+        print(
+            f"{mode:>10}: {timing['matches']:>8} matches, "
+            f"min {timing['min'] * 1000:8.1f} ms, "
+            f"median {timing['median'] * 1000:8.1f} ms"
+        )
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump({"structures": args.structures, "timings": timings}, handle)
+
+
+if __name__ == "__main__":
+    main()
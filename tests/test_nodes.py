@@ -23,3 +23,115 @@ def test_nodes_tree_widget(multiply_add_completed_workchain):
         tree_node = tree.find_node(descendant_process.pk)
         assert descendant_process.is_finished_ok
         assert tree_node.icon_style == "success"
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_nodes_tree_widget_update(multiply_add_completed_workchain, monkeypatch):
+    """Test that only the modified process nodes are loaded upon update."""
+    from aiida import orm
+
+    process = multiply_add_completed_workchain
+    tree = nodes.NodesTreeWidget()
+    tree.nodes = [process]
+
+    loaded = []
+    load_node = orm.load_node
+
+    def _load_node(*args, **kwargs):
+        node = load_node(*args, **kwargs)
+        loaded.append(node.pk)
+        return node
+
+    monkeypatch.setattr(orm, "load_node", _load_node)
+
+    # Nothing has changed, no node is loaded.
+    tree.update()
+    assert loaded == []
+
+    # Only the outdated node is loaded and updated.
+    tree.find_node(process.pk).mtime = None
+    tree.update()
+    assert process.pk in loaded
+    assert tree.find_node(process.pk).mtime == process.mtime
+    for descendant_process in process.called_descendants:
+        assert descendant_process.pk not in loaded
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_nodes_tree_widget_lazy(multiply_add_completed_workchain):
+    """Test that the called processes are only built once expanded in lazy mode."""
+    process = multiply_add_completed_workchain
+    tree = nodes.NodesTreeWidget(lazy=True)
+    tree.nodes = [process]
+
+    root = tree.find_node(process.pk)
+    assert root.is_built
+    for called_process in process.called:
+        tree_node = tree.find_node(called_process.pk)
+        assert not tree_node.opened
+        assert not tree_node.is_built
+        (placeholder,) = tree_node.nodes
+        assert isinstance(placeholder, nodes.AiidaPlaceholderTreeNode)
+        assert placeholder.name == "0 called processes"
+
+        # Expanding the node finds its children.
+        tree_node.opened = True
+        assert tree_node.is_built
+        assert tree_node.outputs_node in tree_node.nodes
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_nodes_tree_widget_index(multiply_add_completed_workchain):
+    """Test that the index of the tree nodes follows the changes of the tree."""
+    process = multiply_add_completed_workchain
+    tree = nodes.NodesTreeWidget()
+    tree.nodes = [process]
+
+    root = tree.find_node(process.pk)
+    assert tree.find_node(process.pk, namespaces=()) is root.outputs_node
+    outputs = [process.outputs[key] for key in process.outputs]
+
+    # Building the outputs folder indexes the output nodes.
+    tree._build_tree(root.outputs_node)
+    for output in outputs:
+        assert tree.find_node(output.pk).pk == output.pk
+
+    # Removing the process from the tree removes all its tree nodes.
+    tree.nodes = []
+    for pk in (process.pk, *(output.pk for output in outputs)):
+        with pytest.raises(KeyError):
+            tree.find_node(pk)
+
+
+def test_walk_tree_deep():
+    """Test that walking deeply nested trees does not hit the recursion limit."""
+    import sys
+
+    import ipytree
+
+    root = node = ipytree.Node(name="0")
+    for depth in range(1, sys.getrecursionlimit() + 10):
+        child = ipytree.Node(name=str(depth))
+        node.nodes = [child]
+        node = child
+    node.nodes = [ipytree.Node(name="a"), ipytree.Node(name="b")]
+
+    names = [node.name for node in nodes.NodesTreeWidget._walk_tree(root)]
+    assert names[:3] == ["0", "1", "2"]
+    assert names[-2:] == ["a", "b"]
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_nodes_tree_widget_idle_update(multiply_add_completed_workchain):
+    """Test that updating an unchanged tree does not modify the tree nodes."""
+    process = multiply_add_completed_workchain
+    tree = nodes.NodesTreeWidget()
+    tree.nodes = [process]
+
+    changes = []
+    for tree_node in tree._walk_tree(tree._tree):
+        tree_node.observe(changes.append)
+
+    tree.update()
+    tree._build_tree(tree.find_node(process.pk))
+    assert changes == []
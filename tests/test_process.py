@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
 from aiida import engine, orm
+from aiida.common import LinkType
 from aiida.workflows.arithmetic.multiply_add import MultiplyAddWorkChain
 
 import aiidalab_widgets_base as awb
@@ -28,6 +31,55 @@ def test_submit_button_widget(multiply_add_process_builder_ready):
     assert isinstance(widget.process, orm.WorkChainNode)
 
 
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_submit_button_widget_asynchronous(multiply_add_process_builder_ready):
+    """Test the asynchronous submission of SubmitButtonWidget."""
+    submitted = []
+
+    widget = awb.SubmitButtonWidget(
+        process_class=MultiplyAddWorkChain,
+        inputs_generator=lambda: multiply_add_process_builder_ready,
+        asynchronous=True,
+    )
+    widget.on_submitted(submitted.append)
+
+    widget.on_btn_submit_press()
+    # The button is locked, a second click is ignored.
+    assert widget.btn_submit.disabled
+    widget.on_btn_submit_press()
+    widget.join()
+
+    assert isinstance(widget.process, orm.WorkChainNode)
+    assert submitted == [widget.process]
+    assert widget.btn_submit.disabled
+    assert widget.submit_progress.layout.display == "none"
+
+    # Errors are shown and the button is unlocked.
+    def failing_inputs_generator():
+        raise ValueError("Invalid <inputs>")
+
+    widget = awb.SubmitButtonWidget(
+        process_class=MultiplyAddWorkChain,
+        inputs_generator=failing_inputs_generator,
+        asynchronous=True,
+    )
+    widget.on_btn_submit_press()
+    widget.join()
+    assert widget.process is None
+    assert not widget.btn_submit.disabled
+    assert "Invalid &lt;inputs&gt;" in widget.submit_out.value
+
+    # With a running event loop, the results are shown from its thread.
+    async def submit():
+        widget.on_btn_submit_press()
+        await asyncio.to_thread(widget.join)
+
+    widget.submit_out.value = ""
+    asyncio.run(submit())
+    assert "Invalid &lt;inputs&gt;" in widget.submit_out.value
+    assert widget.submit_progress.layout.display == "none"
+
+
 @pytest.mark.usefixtures("aiida_profile_clean")
 def test_process_follower_widget(multiply_add_process_builder_ready, daemon_client):
     """Test ProcessFollowerWidget with a simple `WorkChainNode`."""
@@ -76,3 +128,261 @@ def test_process_monitor(
 def test_process_nodes_tree_widget(multiply_add_completed_workchain):
     """Test ProcessNodesTreeWidget with a simple `WorkChainNode`."""
     awb.ProcessNodesTreeWidget(value=multiply_add_completed_workchain.uuid)
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_monitor_events():
+    """Test that the ProcessMonitor only runs the callbacks when the process changes."""
+    import time
+
+    from aiidalab_widgets_base.process import LocalProcessEventSource
+
+    process = orm.WorkflowNode().store()
+    events = LocalProcessEventSource()
+    calls = []
+
+    def wait_for_calls(number):
+        for _ in range(100):
+            if len(calls) >= number:
+                break
+            time.sleep(0.05)
+        assert len(calls) == number
+
+    monitor = awb.ProcessMonitor(
+        value=process.uuid,
+        callbacks=[lambda: calls.append(process.uuid)],
+        event_source=events,
+    )
+    wait_for_calls(1)
+
+    # The process has not changed, the callbacks are not executed.
+    events.notify(process.uuid)
+    time.sleep(0.2)
+    wait_for_calls(1)
+
+    process.set_process_state(engine.ProcessState.RUNNING)
+    events.notify(process.uuid)
+    wait_for_calls(2)
+
+    # Once the process is sealed, the callbacks are executed for the last time.
+    process.seal()
+    events.notify(process.uuid)
+    monitor.join()
+    assert len(calls) == 3
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_monitor_service():
+    """Test that the shared service monitors several processes from one thread."""
+    import time
+
+    from aiidalab_widgets_base.process import ProcessMonitorService
+
+    service = ProcessMonitorService.instance()
+    processes = [orm.WorkflowNode().store() for _ in range(3)]
+    calls = {process.uuid: [] for process in processes}
+    sealed = []
+
+    monitors = [
+        awb.ProcessMonitor(
+            value=process.uuid,
+            callbacks=[calls[process.uuid].append],
+            on_sealed=[sealed.append],
+            shared=True,
+        )
+        for process in processes
+    ]
+    assert all(monitor._monitor_thread is None for monitor in monitors)
+
+    for _ in range(100):
+        if all(calls.values()):
+            break
+        time.sleep(0.05)
+    assert all(len(process_calls) == 1 for process_calls in calls.values())
+
+    # Only the modified process triggers its callbacks.
+    processes[0].set_process_state(engine.ProcessState.RUNNING)
+    time.sleep(3 * service.interval)
+    assert len(calls[processes[0].uuid]) == 2
+    assert len(calls[processes[1].uuid]) == 1
+
+    for process in processes:
+        process.seal()
+    for monitor in monitors:
+        monitor.join()
+    assert sorted(sealed) == sorted(calls)
+
+    # The thread stops once all the processes are sealed.
+    service.join()
+    assert service._thread is None
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_monitor_service_error(monkeypatch, recwarn):
+    """Test that the shared service keeps running after a failed check."""
+    from aiidalab_widgets_base.process import ProcessMonitorService
+
+    service = ProcessMonitorService(interval=0.1)
+    tick = service._tick
+    failures = []
+
+    def failing_tick(subscriptions):
+        if not failures:
+            failures.append(subscriptions)
+            raise RuntimeError("database unavailable")
+        tick(subscriptions)
+
+    monkeypatch.setattr(service, "_tick", failing_tick)
+    process = orm.WorkflowNode().store()
+    states = []
+    service.subscribe(process.uuid, states.append)
+    process.seal()
+    service.join()
+    assert len(failures) == 1
+    assert any("database unavailable" in str(warning.message) for warning in recwarn)
+    assert states[-1][1]
+    assert service._thread is None
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_monitor_service_interval():
+    """Test that the service checks the processes at the shortest interval."""
+    import time
+
+    from aiidalab_widgets_base.process import ProcessMonitorService
+
+    service = ProcessMonitorService(interval=60.0)
+    processes = [orm.WorkflowNode().store() for _ in range(2)]
+    states = {process.uuid: [] for process in processes}
+    service.subscribe(processes[0].uuid, states[processes[0].uuid].append)
+    service.subscribe(processes[1].uuid, states[processes[1].uuid].append, 0.05)
+    for _ in range(100):
+        if all(states.values()):
+            break
+        time.sleep(0.05)
+
+    processes[0].set_process_state(engine.ProcessState.RUNNING)
+    time.sleep(0.5)
+    assert len(states[processes[0].uuid]) == 2
+
+    for process in processes:
+        process.seal()
+    service.join()
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_monitor_backoff():
+    """Test that the polling interval grows while the process is unchanged."""
+    import time
+
+    process = orm.WorkflowNode().store()
+    calls = []
+
+    monitor = awb.ProcessMonitor(
+        value=process.uuid,
+        callbacks=[calls.append],
+        timeout=0.05,
+        max_timeout=0.4,
+    )
+    time.sleep(1.5)
+    assert len(calls) == 1
+    # Polling every 0.05 s would have required about 30 polls.
+    assert monitor.stats["polls"] < 10
+    assert monitor.stats["skipped_polls"] > 0
+
+    process.set_process_state(engine.ProcessState.RUNNING)
+    time.sleep(1.0)
+    assert len(calls) == 2
+
+    process.seal()
+    monitor.join()
+    assert len(calls) == 3
+
+    with pytest.raises(ValueError):
+        awb.ProcessMonitor(timeout=1.0, max_timeout=0.5)
+
+
+@pytest.mark.parametrize("options", [{"max_timeout": 0.2}, {"shared": True}])
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_monitor_called_processes(options):
+    """Test that the changes of the called processes are detected."""
+    import time
+
+    process = orm.WorkflowNode().store()
+    child = orm.CalculationNode()
+    child.base.links.add_incoming(process, LinkType.CALL_CALC, "call")
+    child.store()
+    calls = []
+
+    monitor = awb.ProcessMonitor(
+        value=process.uuid, callbacks=[calls.append], timeout=0.05, **options
+    )
+    for _ in range(100):
+        if calls:
+            break
+        time.sleep(0.05)
+    assert len(calls) == 1
+
+    # Only the called process is modified.
+    mtime = process.mtime
+    child.set_process_state(engine.ProcessState.RUNNING)
+    for _ in range(100):
+        if len(calls) == 2:
+            break
+        time.sleep(0.05)
+    assert len(calls) == 2
+    assert process.mtime == mtime
+
+    process.seal()
+    monitor.join()
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_follower_widget_change_detection():
+    """Test that the followers are only updated when the process has changed."""
+    import ipywidgets as ipw
+
+    class Follower(ipw.VBox):
+        title = "Follower"
+
+        def __init__(self, always_update=False):
+            self.always_update = always_update
+            self.num_updates = 0
+            super().__init__()
+
+        def update(self):
+            self.num_updates += 1
+
+    process = orm.WorkflowNode().store()
+    follower, always_follower = Follower(), Follower(always_update=True)
+    widget = awb.ProcessFollowerWidget(
+        process=process, followers=[follower, always_follower]
+    )
+    assert awb.ProcessMonitor.last_change(process) == process.mtime
+    assert follower.num_updates == always_follower.num_updates == 1
+
+    # Nothing changed, only the follower that opted in is updated.
+    orm.Int(1).store()
+    widget.update()
+    assert follower.num_updates == 1
+    assert always_follower.num_updates == 2
+
+    process.set_process_state(engine.ProcessState.RUNNING)
+    widget.update()
+    assert follower.num_updates == 2
+    assert always_follower.num_updates == 3
+
+    # The changes of the processes called at any depth are detected as well.
+    child = orm.WorkflowNode()
+    child.base.links.add_incoming(process, LinkType.CALL_WORK, "call")
+    child.store()
+    grandchild = orm.CalculationNode()
+    grandchild.base.links.add_incoming(child, LinkType.CALL_CALC, "call")
+    grandchild.store()
+    widget.update()
+    assert follower.num_updates == 3
+
+    grandchild.set_process_state(engine.ProcessState.RUNNING)
+    assert awb.ProcessMonitor.last_change(process) == grandchild.mtime
+    widget.update()
+    assert follower.num_updates == 4
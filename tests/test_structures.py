@@ -1,13 +1,17 @@
+import contextlib
+import io
+import os
 from pathlib import Path
 from textwrap import dedent
 
 import ase
 import numpy as np
 import pytest
-from aiida import common, orm
+from aiida import common, engine, orm
 
 import aiidalab_widgets_base as awb
 from aiidalab_widgets_base import structures
+from aiidalab_widgets_base.utils import get_structure_hash
 
 
 @pytest.fixture
@@ -135,6 +139,129 @@ def test_structure_manager_widget(structure_data_object):
     assert structure_manager_widget.structure is None
 
 
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_manager_widget_store_pending(structure_data_object):
+    """Store several edited structures at once."""
+    widget = awb.StructureManagerWidget(importers=[], storable=True)
+    widget.input_structure = structure_data_object.store()
+
+    for shift in (1.0, 2.0):
+        modified = widget.structure.copy()
+        modified.positions[0] += [0, 0, shift]
+        widget.structure = modified
+        widget.structure_label.value = f"shifted by {shift}"
+        widget.add_pending()
+    assert widget.output.value == "Added Si2 to the pending structures"
+    widget.add_pending()
+    assert "already pending" in widget.output.value
+    assert widget.btn_store_pending.description == "Store all pending (2)"
+
+    # A structure that is not derived from a stored node.
+    widget.input_structure = ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.74]])
+    widget.add_pending()
+
+    nodes = widget.store_pending()
+    assert len(nodes) == 3
+    assert all(node.is_stored for node in nodes)
+    assert [node.label for node in nodes[:2]] == ["shifted by 1.0", "shifted by 2.0"]
+    assert widget.output.value == "Stored 3 structures in AiiDA"
+    assert widget.btn_store_pending.disabled
+    assert widget.pending == []
+
+    # Both edits are created by a single process from the same source.
+    creators = {node.creator.pk for node in nodes[:2]}
+    assert len(creators) == 1
+    process = nodes[0].creator
+    assert process.is_finished_ok
+    assert process.is_sealed
+    assert process.process_label.endswith("user_modifications")
+    assert process.base.attributes.get("function_name") == "user_modifications"
+    assert process.inputs.source_structure.pk == structure_data_object.pk
+    assert nodes[2].creator is None
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_manager_widget_store_pending_error(
+    structure_data_object, monkeypatch
+):
+    """The pending structures are kept if they could not be stored."""
+    widget = awb.StructureManagerWidget(importers=[], storable=True)
+    widget.input_structure = ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.74]])
+    widget.add_pending()
+    widget.input_structure = structure_data_object.store()
+    modified = widget.structure.copy()
+    modified.positions[0] += [0, 0, 1.0]
+    widget.structure = modified
+    widget.add_pending()
+
+    def fail(*_):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(widget, "_store_modifications", fail)
+    assert widget.store_pending() == []
+    assert "database is locked" in widget.output.value
+    assert len(widget.pending) == 2
+    assert not any(node.is_stored for node, _ in widget.pending)
+    assert widget.structure_node is widget.pending[1][0]
+    assert widget.btn_store_pending.description == "Store all pending (2)"
+    assert orm.QueryBuilder().append(orm.Data).count() == 1
+
+    monkeypatch.undo()
+    nodes = widget.store_pending()
+    assert all(node.is_stored for node in nodes)
+    assert nodes[1].creator.inputs.source_structure.pk == structure_data_object.pk
+    assert widget.pending == []
+
+
+def test_structure_hash():
+    """Identical geometries have the same hash."""
+    from ase.build import bulk
+
+    structure = bulk("NaCl", "rocksalt", a=5.64, cubic=True)
+    structure_hash = get_structure_hash(structure)
+
+    # The order of the atoms, periodic images and rotations do not matter.
+    shuffled = structure[[3, 1, 7, 0, 2, 5, 4, 6]]
+    shuffled.positions[0] += shuffled.cell[0]
+    shuffled.rotate(30, "z", rotate_cell=True)
+    assert get_structure_hash(shuffled) == structure_hash
+
+    # Tiny numerical noise is ignored, but not real displacements.
+    noisy = structure.copy()
+    noisy.positions += 1e-8
+    assert get_structure_hash(noisy) == structure_hash
+    displaced = structure.copy()
+    displaced.positions[0] += [0.1, 0, 0]
+    assert get_structure_hash(displaced) != structure_hash
+
+    with pytest.raises(TypeError):
+        get_structure_hash("NaCl")
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_manager_widget_deduplicate(structure_data_object):
+    """Reuse an identical structure instead of storing it again."""
+    widget = awb.StructureManagerWidget(importers=[], deduplicate=True)
+    widget.input_structure = structure_data_object.get_ase()
+    widget.store_structure()
+    stored = widget.structure_node
+    assert stored.is_stored
+    assert stored.base.extras.get("structure_hash")
+
+    # Upload the same structure again, with the atoms in a different order.
+    widget.input_structure = structure_data_object.get_ase()[::-1]
+    assert not widget.structure_node.is_stored
+    widget.store_structure()
+    assert widget.structure_node.pk == stored.pk
+    assert "Identical structure already stored" in widget.output.value
+
+    # Without deduplication, the structure is stored again.
+    widget = awb.StructureManagerWidget(importers=[])
+    widget.input_structure = structure_data_object.get_ase()
+    widget.store_structure()
+    assert widget.structure_node.pk != stored.pk
+
+
 @pytest.mark.usefixtures("aiida_profile_clean")
 def test_structure_browser_widget(structure_data_object, monkeypatch):
     """Test the `StructureBrowserWidget`."""
@@ -151,8 +278,8 @@ def test_structure_browser_widget(structure_data_object, monkeypatch):
     structure_browser_widget.search()
     assert len(structure_browser_widget.results.options) == 2
 
-    # Simulate the structure selection.
-    structure_browser_widget.results.value = structure_data_object
+    # Simulate the structure selection, results are referenced by their PK.
+    structure_browser_widget.results.value = structure_data_object.pk
 
     assert structure_browser_widget.structure.uuid == structure_data_object.uuid
     assert structure_browser_widget.pk_input.value == str(structure_data_object.pk)
@@ -175,7 +302,7 @@ def test_structure_browser_widget(structure_data_object, monkeypatch):
     structure_browser_widget._on_load_button_clicked()
 
     assert structure_browser_widget.structure.uuid == structure_data_object.uuid
-    assert structure_browser_widget.results.value.uuid == structure_data_object.uuid
+    assert structure_browser_widget.results.value == structure_data_object.pk
     assert structure_browser_widget.info.value == ""
 
     # Loading by PK should respect the configured query types.
@@ -199,6 +326,232 @@ def test_structure_browser_widget(structure_data_object, monkeypatch):
     )
 
 
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_browser_widget_pagination(structure_data_object):
+    """Test that the `StructureBrowserWidget` results are fetched page by page."""
+    stored = [structure_data_object.clone().store() for _ in range(3)]
+
+    widget = awb.StructureBrowserWidget(page_size=2)
+    assert widget.results.options[0][0] == "Select a Structure (3 found)"
+    assert widget.page_info.value == "Page 1 of 2"
+    assert widget.btn_previous_page.disabled
+    assert not widget.btn_next_page.disabled
+
+    # Newest structures come first.
+    assert [value for _, value in widget.results.options[1:]] == [
+        stored[2].pk,
+        stored[1].pk,
+    ]
+
+    widget.btn_next_page.click()
+    assert widget.page_info.value == "Page 2 of 2"
+    assert [value for _, value in widget.results.options[1:]] == [stored[0].pk]
+    assert not widget.btn_previous_page.disabled
+    assert widget.btn_next_page.disabled
+
+    widget.btn_previous_page.click()
+    assert widget.page_info.value == "Page 1 of 2"
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_browser_widget_modes(structure_data_object, generate_calc_job_node):
+    """Test that each provenance mode finds the right structures."""
+    uploaded = structure_data_object.store()
+
+    @engine.calcfunction
+    def edit(structure):
+        return structure.clone()
+
+    edited = edit(uploaded)
+
+    calculated = structure_data_object.clone()
+    calculated.base.links.add_incoming(
+        generate_calc_job_node(),
+        link_type=common.LinkType.CREATE,
+        link_label="structure",
+    )
+    calculated.store()
+
+    widget = awb.StructureBrowserWidget()
+    expected = {
+        "uploaded": {uploaded.pk},
+        "edited": {edited.pk},
+        "calculated": {calculated.pk},
+        "all": {uploaded.pk, edited.pk, calculated.pk},
+    }
+    for mode, pks in expected.items():
+        widget.mode.value = mode
+        assert {value for _, value in widget.results.options[1:]} == pks
+
+
+@pytest.mark.parametrize("subquery", [True, False])
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_browser_widget_uploaded_mode(
+    structure_data_object, generate_calc_job_node, monkeypatch, subquery
+):
+    """Test that the "uploaded" mode matches the query of the excluded structures."""
+    from aiidalab_widgets_base import structures
+
+    if subquery:
+        # The storage backend of the tests supports the NOT EXISTS subquery.
+        qbuild = orm.QueryBuilder().append(orm.StructureData, tag="structures")
+        assert structures._add_no_incoming_link_subquery(qbuild, "structures")
+    else:
+        monkeypatch.setattr(
+            structures, "_add_no_incoming_link_subquery", lambda *_: False
+        )
+    uploaded = [structure_data_object.clone().store() for _ in range(3)]
+    for _ in range(2):
+        calculated = structure_data_object.clone()
+        calculated.base.links.add_incoming(
+            generate_calc_job_node(),
+            link_type=common.LinkType.CREATE,
+            link_label="structure",
+        )
+        calculated.store()
+
+    widget = awb.StructureBrowserWidget()
+    widget.mode.value = "uploaded"
+
+    # The structures with an incoming link, queried separately.
+    with_incoming = (
+        orm.QueryBuilder()
+        .append(orm.StructureData, project=["id"], tag="structures")
+        .append(orm.Node, with_outgoing="structures")
+    )
+    all_structures = orm.QueryBuilder().append(orm.StructureData, project=["id"])
+    expected = set(all_structures.all(flat=True)) - set(with_incoming.all(flat=True))
+    assert expected == {node.pk for node in uploaded}
+    assert {value for _, value in widget.results.options[1:]} == expected
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_browser_widget_process_labels(generate_calc_job_node, monkeypatch):
+    """Test that process labels are only queried for the "calculated" mode."""
+    monkeypatch.setattr(awb.StructureBrowserWidget, "_process_labels_cache", {})
+    calcjob = generate_calc_job_node()
+    calcjob.label = "relax"
+
+    widget = awb.StructureBrowserWidget()
+    assert widget.drop_label.options == ("All",)
+    assert widget.drop_label.disabled
+
+    widget.mode.value = "calculated"
+    assert widget.drop_label.options == ("All", "relax")
+    assert not widget.drop_label.disabled
+
+    # Labels are cached across the widget instances.
+    generate_calc_job_node().label = "scf"
+    assert awb.StructureBrowserWidget.get_process_labels() == ["relax"]
+
+    monkeypatch.setattr(awb.StructureBrowserWidget, "PROCESS_LABELS_TTL", 0)
+    assert awb.StructureBrowserWidget.get_process_labels() == ["relax", "scf"]
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_structure_browser_widget_typeahead(structure_data_object):
+    """Test the text and elements search of the `StructureBrowserWidget`."""
+    silicon = structure_data_object.clone().store()
+    quartz = orm.StructureData(
+        ase=ase.Atoms(
+            "SiO2", positions=[[0, 0, 0], [1, 0, 0], [0, 1, 0]], cell=[5, 5, 5]
+        )
+    )
+    quartz.label = "Quartz"
+    quartz.store()
+
+    widget = awb.StructureBrowserWidget()
+    widget.preprocess()
+
+    def search_for(text="", elements=""):
+        widget.search_text.value = text
+        widget.search_elements.value = elements
+        widget._typeahead_timer.join()
+        return {value for _, value in widget.results.options[1:]}
+
+    assert search_for("quartz") == {quartz.pk}
+    assert search_for("si2") == {silicon.pk}
+    assert search_for(elements="O") == {quartz.pk}
+    assert search_for(elements="Si, O") == {quartz.pk}
+    assert search_for(elements="Si") == {silicon.pk, quartz.pk}
+
+    # Unknown elements are reported and ignored.
+    assert search_for(elements="Si Xx") == {silicon.pk, quartz.pk}
+    assert "Unknown element(s): Xx" in widget.info.value
+    assert search_for(elements="Si") == {silicon.pk, quartz.pk}
+    assert widget.info.value == ""
+
+    # Searching does not remove the other messages.
+    widget.pk_input.value = "-1"
+    widget._on_load_button_clicked()
+    assert search_for("quartz") == {quartz.pk}
+    assert "Invalid PK" in widget.info.value
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_formula_indexer(structure_data_object):
+    """Test that `FormulaIndexer` adds the formula extra in batches."""
+    nodes = [structure_data_object.clone().store() for _ in range(3)]
+    nodes[0].base.extras.set("smiles", "[Si][Si]")
+    # A CIF file without atoms can not be read as a structure.
+    broken = orm.CifData(file=io.BytesIO(b"data_empty\n_cell_length_a 1.0\n")).store()
+
+    indexer = structures.FormulaIndexer((orm.StructureData, orm.CifData), batch_size=2)
+    indexer.start()
+    indexer.join()
+
+    # Structures that can not be read are marked and not read again.
+    broken_extras = orm.load_node(broken.pk).base.extras.all
+    assert broken_extras["formula"] == structures.FormulaIndexer.UNREADABLE_FORMULA
+    assert indexer._next_batch(0) == []
+
+    for node in nodes:
+        assert orm.load_node(node.pk).base.extras.get("formula") == "Si2"
+    # Existing extras are preserved by the bulk update.
+    assert orm.load_node(nodes[0].pk).base.extras.get("smiles") == "[Si][Si]"
+    structure_hashes = {
+        orm.load_node(node.pk).base.extras.get("structure_hash") for node in nodes
+    }
+    assert structure_hashes == {get_structure_hash(structure_data_object)}
+
+    # Searching does not wait for the indexer, formulas are shown once indexed.
+    new_node = structure_data_object.clone().store()
+    widget = awb.StructureBrowserWidget()
+    widget.preprocess()
+    widget.search()
+    labels = {value: label for label, value in widget.results.options}
+    assert "Si2" in labels[new_node.pk]
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_formula_indexer_concurrent_extras(structure_data_object, monkeypatch):
+    """The extras set while a batch is being indexed are not lost."""
+    from aiida.manage import get_manager
+    from aiida.orm.entities import EntityTypes
+
+    first, second = (structure_data_object.clone().store() for _ in range(2))
+    get_formula = structures.get_formula
+
+    def get_formula_while_tagged(structure):
+        if structure.pk == second.pk:
+            # Another process tags the first structure while the batch is indexed.
+            get_manager().get_profile_storage().bulk_update(
+                EntityTypes.NODE, [{"id": first.pk, "extras": {"tag": "selected"}}]
+            )
+        return get_formula(structure)
+
+    monkeypatch.setattr(structures, "get_formula", get_formula_while_tagged)
+    structures.FormulaIndexer((orm.StructureData,)).index()
+
+    extras = (
+        orm.QueryBuilder()
+        .append(orm.StructureData, filters={"id": first.pk}, project="extras")
+        .first(flat=True)
+    )
+    assert extras["tag"] == "selected"
+    assert extras["formula"] == "Si2"
+
+
 @pytest.mark.parametrize("add_auxiliary_cell", (False, True))
 @pytest.mark.usefixtures("aiida_profile_clean")
 def test_structure_upload_widget(add_auxiliary_cell, file_upload_change):
@@ -275,6 +628,43 @@ def test_structure_examples_widget():
     assert widget.structure.get_chemical_formula() == "O4Si2"
 
 
+def test_structure_examples_widget_cache(monkeypatch, tmp_path):
+    """Parse every example file only once."""
+    source = Path(__file__).parent / ".." / "miscellaneous" / "structures"
+    example = tmp_path / "SiO2.xyz"
+    example.write_text((source / "SiO2.xyz").read_text())
+    preparsed = tmp_path / "SiO2.xyz.npz"
+
+    widget = awb.StructureExamplesWidget(
+        examples=[("Silicon oxide", example)], warm_up=1
+    )
+    widget._warm_up_thread.join()
+    assert preparsed.exists()
+
+    def fail(*_, **__):
+        raise AssertionError("The example should not be parsed again")
+
+    monkeypatch.setattr(structures, "get_ase_from_file", fail)
+    widget._select_structure.label = "Silicon oxide"
+    assert widget.structure.get_chemical_formula() == "O4Si2"
+    # Modifying the selected structure does not modify the cache.
+    widget.structure.positions[0] += 1.0
+    assert not np.allclose(
+        widget.structure.positions, widget.load_example(example).positions
+    )
+
+    # A new session reads the preparsed file.
+    monkeypatch.setattr(awb.StructureExamplesWidget, "_parsed_examples", {})
+    structure = awb.StructureExamplesWidget.load_example(example)
+    assert structure.get_chemical_formula() == "O4Si2"
+    assert np.allclose(structure.cell, ase.io.read(example).cell)
+
+    # The preparsed file is ignored once the source changes.
+    example.write_text((source / "Si.xyz").read_text())
+    monkeypatch.undo()
+    assert widget.load_example(example).get_chemical_formula() == "Si2"
+
+
 @pytest.mark.usefixtures("aiida_profile_clean")
 def test_smiles_widget():
     """Test the `SmilesWidget`."""
@@ -284,6 +674,7 @@ def test_smiles_widget():
     # Simulate the structure generation.
     widget.smiles.value = "C"
     widget._on_button_pressed()
+    widget.join()
     assert isinstance(widget.structure, ase.Atoms)
     assert widget.structure.get_chemical_formula() == "CH4"
     # By default, a rectangular cell is added (10 angstroms in each direction)
@@ -300,11 +691,13 @@ def test_smiles_widget():
     # Regression test that we can generate 1-atom and 2-atom molecules
     widget.smiles.value = "[O]"
     widget._on_button_pressed()
+    widget.join()
     assert isinstance(widget.structure, ase.Atoms)
     assert widget.structure.get_chemical_formula() == "O"
 
     widget.smiles.value = "N#N"
     widget._on_button_pressed()
+    widget.join()
     assert isinstance(widget.structure, ase.Atoms)
     assert widget.structure.get_chemical_formula() == "N2"
 
@@ -314,6 +707,180 @@ def test_smiles_widget():
     assert widget.structure is None
 
 
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_smiles_widget_conformers():
+    """Keep the lowest-energy one of several conformers."""
+    widget = awb.SmilesWidget(use_cache=False)
+
+    widget.num_conformers.value = 5
+    widget.smiles.value = "CCCCCC"
+    widget._on_button_pressed()
+    assert widget.create_structure_btn.disabled
+    widget.join()
+    assert not widget.create_structure_btn.disabled
+    assert widget.structure.get_chemical_formula() == "C6H14"
+
+    # The conformer generation is deterministic.
+    species, positions, _ = structures.rdkit_conformer("CCCCCC", 1000, 5)
+    assert species == widget.structure.get_chemical_symbols()
+    distances = np.linalg.norm(positions - positions[0], axis=1)
+    assert np.allclose(distances, widget.structure.get_distances(0, range(20)))
+
+
+def test_smiles_widget_event_loop():
+    """Show the conformer from the thread of the running event loop."""
+    import asyncio
+    import threading
+
+    widget = awb.SmilesWidget(use_cache=False)
+    threads = []
+    widget.observe(lambda _: threads.append(threading.current_thread()), "structure")
+
+    async def generate():
+        widget.smiles.value = "CCO"
+        widget._on_button_pressed()
+        await asyncio.to_thread(widget.join)
+
+    asyncio.run(generate())
+    assert widget.structure.get_chemical_formula() == "C2H6O"
+    assert threads == [threading.main_thread()]
+
+
+def test_smiles_widget_cancel():
+    """Cancel the conformer generation and abort it after the timeout."""
+    widget = awb.SmilesWidget(timeout=0, use_cache=False)
+    widget.smiles.value = "C"
+    widget._on_button_pressed()
+    widget.join()
+    assert widget.structure is None
+    assert "could not generate conformer in 0 seconds" in widget.output.value
+
+    widget.timeout = 120
+    widget._on_button_pressed()
+    widget.cancel()
+    widget.join()
+    assert widget.structure is None
+    assert widget.output.value == "Conformer generation was cancelled"
+    assert not widget.create_structure_btn.disabled
+
+
+def test_smiles_widget_cache(tmp_path):
+    """Reuse the cached conformers instead of generating them again."""
+    widget = awb.SmilesWidget(cache_dir=tmp_path)
+    widget.smiles.value = "OCC"
+    widget._on_button_pressed()
+    widget.join()
+    assert widget.structure.get_chemical_formula() == "C2H6O"
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    structure = widget.structure
+    widget.structure = None
+    widget._on_button_pressed()
+    # The structure is taken from the cache without starting the worker.
+    assert widget.structure == structure
+    assert widget.output.value == "Canonical SMILES: CCO"
+
+    # Different settings use a different cache entry.
+    widget.num_conformers.value = 2
+    widget._on_button_pressed()
+    widget.join()
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+
+
+def test_conformer_cache_eviction(tmp_path):
+    """Evict the least recently used conformers when the cache is full."""
+    cache = structures.ConformerCache(tmp_path)
+    conformer = (["H", "H"], np.array([[0.0, 0.0, 0.0], [0.74, 0.0, 0.0]]), [])
+    cache.put("first", conformer)
+    cache.put("second", conformer)
+    species, positions, warnings = cache.get("first")
+    assert species == ["H", "H"]
+    assert np.allclose(positions, conformer[1])
+    assert warnings == []
+    assert cache.get("missing") is None
+
+    # The cache is evicted down to 80% of its maximum size.
+    os.utime(tmp_path / "second.npz", (0, 0))
+    cache.max_size = int((tmp_path / "first.npz").stat().st_size * 2.5)
+    cache.put("third", conformer)
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_conformer_cache_scans(tmp_path, monkeypatch):
+    """The cache directory is only scanned when the cache may be full."""
+    cache = structures.ConformerCache(tmp_path)
+    evict = cache._evict
+    scans = []
+
+    def count_scans():
+        scans.append(None)
+        evict()
+
+    monkeypatch.setattr(cache, "_evict", count_scans)
+    conformer = (["H", "H"], np.array([[0.0, 0.0, 0.0], [0.74, 0.0, 0.0]]), [])
+    for index in range(10):
+        cache.put(f"key{index}", conformer)
+    assert len(scans) == 1
+
+    cache.max_size = (tmp_path / "key0.npz").stat().st_size * 12
+    for index in range(10, 20):
+        cache.put(f"key{index}", conformer)
+    assert len(scans) == 3
+    assert len(list(tmp_path.glob("*.npz"))) <= 12
+
+
+def test_smiles_widget_batch_import():
+    """Import a list of SMILES as `ase.Atoms` objects."""
+    widget = awb.SmilesWidget(use_cache=False)
+    widget.batch_smiles.value = "# solvents\nO water\nOCC ethanol\nCCO\ninvalid\n"
+    widget._on_batch_button_pressed()
+    widget.join()
+
+    formulas = sorted(atoms.get_chemical_formula() for atoms in widget.batch_results)
+    assert formulas == ["C2H6O", "H2O"]
+    assert list(widget.batch_errors) == ["invalid"]
+    assert widget.batch_stats["submitted"] == 4
+    assert widget.batch_stats["duplicates"] == 1
+    assert widget.batch_stats["generated"] == 2
+    assert widget.batch_stats["failed"] == 1
+    assert "Batch import finished" in widget.batch_output.value
+    assert not widget.batch_btn.disabled
+
+
+def test_smiles_widget_batch_import_timeout():
+    """Molecules not generated in time are reported as failed."""
+    widget = awb.SmilesWidget(use_cache=False, timeout=0)
+    widget.import_batch(["C", "N"], processes=1)
+    widget.join()
+
+    assert widget.batch_results == []
+    assert sorted(widget.batch_errors) == ["C", "N"]
+    assert "0 seconds" in widget.batch_errors["C"]
+    assert widget.batch_stats["failed"] == 2
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_smiles_widget_batch_import_to_group(tmp_path):
+    """Store the imported molecules in a group."""
+    widget = awb.SmilesWidget(cache_dir=tmp_path)
+    widget.import_batch(["C", "N", "C"], group_label="molecules", processes=2)
+    widget.join()
+
+    group = orm.load_group("molecules")
+    assert group.count() == 2
+    assert {node.pk for node in group.nodes} == {
+        node.pk for node in widget.batch_results
+    }
+    assert {node.base.extras.get("smiles") for node in group.nodes} == {"C", "N"}
+
+    # The second import is served from the cache.
+    widget.import_batch(["C"])
+    widget.join()
+    assert widget.batch_results[0].get_chemical_formula() == "CH4"
+
+
 @pytest.mark.usefixtures("aiida_profile_clean")
 def test_smiles_widget_without_cell():
     """Test the `SmilesWidget`."""
@@ -323,6 +890,7 @@ def test_smiles_widget_without_cell():
     # Simulate the structure generation.
     widget.smiles.value = "C"
     widget._on_button_pressed()
+    widget.join()
     assert isinstance(widget.structure, ase.Atoms)
     assert widget.structure.get_chemical_formula() == "CH4"
     # There should be no cell, which ASE represents with a zero cell
@@ -509,12 +1077,14 @@ def test_tough_smiles():
     # Throwing in this non-canonical string should not raise
     widget.smiles.value = "C=CC1=C(C2=CC=C(C3=CC=CC=C3)C=C2)C=C(C=C)C(C4=CC=C(C(C=C5)=CC=C5C(C=C6C=C)=C(C=C)C=C6C7=CC=C(C(C=C8)=CC=C8C(C=C9C=C)=C(C=C)C=C9C%10=CC=CC=C%10)C=C7)C=C4)=C1"
     widget._on_button_pressed()
+    widget.join()
     assert isinstance(widget.structure, ase.Atoms)
     assert widget.structure.get_chemical_formula() == "C72H54"
 
     # Regression test for https://github.com/aiidalab/aiidalab-widgets-base/issues/510
     widget.smiles.value = "CC1=C(C)C(C2=C3C=CC4=C(C5=C(C)C(C)=C(C6=C(C=CC=C7)C7=CC8=C6C=CC=C8)C(C)=C5C)C9=CC=C%10N9[Fe]%11(N%12C(C=CC%12=C(C%13=C(C)C(C)=C(C%14=C(C=CC=C%15)C%15=CC%16=C%14C=CC=C%16)C(C)=C%13C)C%17=CC=C2N%17%11)=C%10C%18=C(C)C(C)=C(C%19=C(C=CC=C%20)C%20=CC%21=C%19C=CC=C%21)C(C)=C%18C)N43)=C(C)C(C)=C1C%22=C(C=CC=C%23)C%23=CC%24=C%22C=CC=C%24"
     widget._on_button_pressed()
+    widget.join()
     assert isinstance(widget.structure, ase.Atoms)
     assert widget.structure.get_chemical_formula() == "C116H92FeN4"
 
@@ -628,3 +1198,203 @@ def test_basic_structure_editor(structure_data_object):
     widget.add()
     assert len(widget.structure) == 7
     assert widget.structure.get_chemical_formula() == "C2H3OSi"
+
+
+def test_basic_structure_editor_multiple_sites():
+    """Modify and functionalize many atoms at once."""
+    widget = awb.BasicStructureEditor()
+    structure = ase.Atoms("C4", positions=[[2.0 * i, 0, 0] for i in range(4)])
+    structure.set_masses([13.0] * 4)
+    structure.set_tags([1, 2, 3, 4])
+    structure.set_initial_magnetic_moments([1.0] * 4)
+    widget.structure = structure
+
+    widget.selection = [1, 3]
+    widget.element.value = "N"
+    widget.mod_element()
+    assert widget.structure.get_chemical_symbols() == ["C", "N", "C", "N"]
+    masses = [13.0, ase.data.atomic_masses[7]]
+    assert np.allclose(widget.structure.get_masses()[[0, 1]], masses)
+    assert list(widget.structure.get_tags()) == [1, 0, 3, 0]
+    assert list(widget.structure.get_initial_magnetic_moments()) == [1, 0, 1, 0]
+
+    # Add a hydrogen to each of the selected atoms along the z axis.
+    widget.axis_p1.value = "0 0 0"
+    widget.axis_p2.value = "0 0 1"
+    widget.selection = [0, 1, 2]
+    widget.element.value = "H"
+    widget.add()
+    assert widget.structure.get_chemical_formula() == "C2H3N2"
+    assert widget.input_selection == [4, 5, 6]
+    expected_bonds = ase.data.covalent_radii[[6, 7, 6]] + ase.data.covalent_radii[1]
+    assert np.allclose(widget.structure.positions[4:, 2], expected_bonds)
+    assert np.allclose(widget.structure.positions[4:, 0], [0.0, 2.0, 4.0])
+
+    # Add a methyl group to two atoms.
+    widget.ligand.label = "Methyl -CH3"
+    widget.selection = [0, 3]
+    widget.add()
+    assert widget.structure.get_chemical_formula() == "C4H9N2"
+    assert widget.input_selection == list(range(7, 15))
+    # Both copies of the ligand have the same geometry.
+    first, second = widget.structure[7:11], widget.structure[11:15]
+    shift = [6.0, 0.0, ase.data.covalent_radii[7] - ase.data.covalent_radii[6]]
+    assert np.allclose(second.positions - first.positions, shift)
+
+
+def test_basic_structure_editor_transaction():
+    """Apply several operations with a single structure change."""
+    widget = awb.BasicStructureEditor()
+    original = ase.Atoms("CO", positions=[[0, 0, 0], [0, 0, 1.2]])
+    widget.structure = original
+    changes = []
+    widget.observe(changes.append, names="structure")
+
+    with widget.transaction():
+        widget.selection = [1]
+        widget.dxyz.value = "1.0 0.0 0.0"
+        widget.translate_dxdydz()
+        widget.translate_dxdydz()
+        widget.element.value = "N"
+        widget.mod_element()
+        assert not changes
+
+    assert len(changes) == 1
+    assert changes[0]["old"] is original
+    assert widget.structure.get_chemical_formula() == "CN"
+    assert np.allclose(widget.structure.positions[1], [2.0, 0.0, 1.2])
+    # The original structure was not modified.
+    assert original.get_chemical_formula() == "CO"
+    assert np.allclose(original.positions[1], [0.0, 0.0, 1.2])
+
+    # The structure is restored if the transaction fails.
+    modified = widget.structure
+    with pytest.raises(ValueError), widget.transaction():
+        widget.selection = [0]
+        widget.remove()
+        raise ValueError
+    assert widget.structure == modified
+    assert len(widget.structure) == 2
+
+
+@pytest.mark.parametrize("in_transaction", [False, True])
+def test_basic_structure_editor_transaction_selection(in_transaction):
+    """Within a transaction, the selection follows the operations as well."""
+    editor = awb.BasicStructureEditor()
+    awb.StructureManagerWidget(importers=[], editors=[editor])
+    editor.structure = ase.Atoms("CO", positions=[[0, 0, 0], [0, 0, 1.2]])
+    editor.selection = [1]
+    editor.element.value = "H"
+    editor.dxyz.value = "1.0 0.0 0.0"
+
+    with editor.transaction() if in_transaction else contextlib.nullcontext():
+        editor.add()
+        # The atom just added is selected and translated.
+        editor.translate_dxdydz()
+
+    assert editor.selection == [2]
+    assert np.allclose(editor.structure.positions[1], [0.0, 0.0, 1.2])
+    assert editor.structure.positions[2][0] == pytest.approx(1.0)
+
+
+def test_neighbor_list():
+    """The incrementally updated neighbor list matches a full rebuild."""
+    from ase.build import bulk
+
+    from aiidalab_widgets_base.utils.neighbors import NeighborList
+
+    structure = bulk("Si", cubic=True).repeat((3, 3, 3))
+    neighbors = NeighborList(structure)
+    assert set(neighbors.coordination_numbers()) == {4}
+    bond_lengths = np.linalg.norm(neighbors.bond_vectors(0), axis=1)
+    assert np.allclose(bond_lengths, 2.35, atol=0.01)
+
+    # Move an atom away, replace another one and append a new atom.
+    structure = structure.copy()
+    structure.positions[0] += [0.0, 0.0, 2.0]
+    structure.numbers[10] = 6
+    structure += ase.Atoms("H", positions=[structure.positions[20] + [0.0, 0.0, 1.3]])
+    neighbors.update(structure)
+
+    rebuilt = NeighborList(structure)
+    assert len(neighbors) == len(rebuilt) == len(structure)
+    for index in range(len(structure)):
+        assert neighbors[index] == rebuilt[index]
+    assert len(structure) - 1 in neighbors[20]
+
+    # Removing atoms triggers a full rebuild.
+    del structure[[0]]
+    neighbors.update(structure)
+    assert len(neighbors) == len(structure)
+
+
+def test_basic_structure_editor_away_from_neighbors():
+    """Add atoms pointing away from the existing bonds."""
+    widget = awb.BasicStructureEditor()
+    widget.structure = ase.Atoms("CO", positions=[[0, 0, 0], [0, 0, 1.2]])
+    assert widget.neighbors[0] == [1]
+
+    widget.axis_p1.value = "0 0 0"
+    widget.axis_p2.value = "1 0 0"
+    widget.away_from_neighbors.value = True
+    widget.selection = [0]
+    widget.element.value = "H"
+    widget.add()
+    # The hydrogen is added opposite to the C-O bond, not along the action vector.
+    hydrogen = widget.structure.positions[2]
+    assert np.allclose(hydrogen[:2], [0.0, 0.0])
+    assert hydrogen[2] < 0
+    assert widget.neighbors[0] == [1, 2]
+
+
+def test_symmetry_analysis_cache(monkeypatch):
+    """Run spglib only once for the same structure and settings."""
+    import spglib
+    from ase.build import bulk
+
+    from aiidalab_widgets_base.utils import symmetry
+
+    symmetry.clear_cache()
+    calls = []
+
+    def count_calls(function):
+        def wrapper(*args, **kwargs):
+            calls.append(function.__name__)
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(
+        spglib, "standardize_cell", count_calls(spglib.standardize_cell)
+    )
+    monkeypatch.setattr(
+        spglib, "get_symmetry_dataset", count_calls(spglib.get_symmetry_dataset)
+    )
+
+    conventional = bulk("Si", cubic=True)
+    editor = awb.BasicCellEditor()
+    viewer = awb.viewers.StructureDataViewer()
+    editor.structure = viewer.structure = conventional
+    assert viewer.cell_spacegroup.value == "Spacegroup: Fd-3m (No.227)"
+    assert calls == ["get_symmetry_dataset"]
+
+    editor._to_primitive_cell()
+    viewer.structure = editor.structure
+    assert len(editor.structure) == 2
+    # The primitive cell is derived from the dataset computed for the viewer.
+    assert calls == ["get_symmetry_dataset", "get_symmetry_dataset"]
+
+    # Repeating the same conversion and display does not call spglib again.
+    editor.structure = viewer.structure = conventional.copy()
+    editor._to_primitive_cell()
+    viewer.structure = editor.structure
+    assert len(editor.structure) == 2
+    assert viewer.cell_spacegroup.value == "Spacegroup: Fd-3m (No.227)"
+    assert len(calls) == 2
+
+    # A different structure has a different fingerprint.
+    structure = editor.structure.copy()
+    structure.positions[0] += 0.1
+    assert symmetry.structure_fingerprint(structure) != (
+        symmetry.structure_fingerprint(editor.structure)
+    )
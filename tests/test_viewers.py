@@ -52,6 +52,36 @@ def test_several_data_viewers(generate_calc_job_node):
     assert isinstance(v, viewers.ProcessNodeViewerWidget)
 
 
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_process_node_viewer_report_streaming():
+    """Test that the process report is fetched incrementally and capped."""
+    from aiida.common import timezone
+
+    process = orm.WorkflowNode()
+    process.set_process_state("running")
+    process.store()
+
+    def log(message, levelname="REPORT"):
+        orm.Log(timezone.now(), "test", levelname, process.pk, message).store()
+
+    log("first <step>")
+    log("debugging", levelname="DEBUG")
+    widget = viewers.ProcessNodeViewerWidget(process, max_lines=2)
+    assert "REPORT: first &lt;step&gt;" in widget.value
+    assert "debugging" not in widget.value
+
+    log("second")
+    log("third", levelname="WARNING")
+    widget.update()
+    assert "first" not in widget.value
+    assert "REPORT: second" in widget.value
+    assert "WARNING: third" in widget.value
+    assert "1 earlier report lines are not shown" in widget.value
+
+    # Only the new entries are fetched.
+    assert widget._fetch_report_lines() == []
+
+
 @pytest.mark.usefixtures("aiida_profile_clean")
 def test_dict_viewer_renders_table_and_csv_payload():
     long_value = "0123456789" * 5